@@ -0,0 +1,377 @@
+"""TOSS benchmarks.
+
+Usage: python bench.py [name ...]
+       python bench.py suite [scenario ...] [--out FILE] [--baseline FILE] [--save-baseline] [--repeat N (default: as recorded)] [--tolerance 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import psutil
+import textual
+from textual import events
+from textual.app import App
+from textual.containers import Horizontal
+import hwctl
+import main
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+REPEAT = 3
+FLOOR_MS = 0.5  # timer and scheduler noise; smaller slowdowns never count as regressions
+
+def rss_mb(): return psutil.Process().memory_info().rss / 2**20
+
+def quantiles(samples) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(samples[-1] * 1000, 3)}
+
+def summary(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1e6
+    return f"mean {sum(samples) / len(samples) * 1e6:.1f}us p50 {pick(0.5):.1f}us p99 {pick(0.99):.1f}us max {samples[-1] * 1e6:.1f}us"
+
+async def bench_scrollback(lines=100_000):
+    class Host(App):
+        def compose(self): yield main.TermLog(id="term-log")
+    async with Host().run_test(size=(100, 40)) as pilot:
+        log = pilot.app.query_one(main.TermLog)
+        before, samples = rss_mb(), []
+        for i in range(lines):
+            t = time.perf_counter()
+            log.write(f"line {i:06d} the quick brown fox jumps over the lazy dog\n", markup=False)
+            samples.append(time.perf_counter() - t)
+            if i % 1000 == 0: await pilot.pause()
+        await pilot.pause()
+        print(f"scrollback: {lines} appends, cap {log.scrollback.lines.maxlen} lines")
+        print(f"  per-append {summary(samples)}")
+        print(f"  first 1k {summary(samples[:1000])} | last 1k {summary(samples[-1000:])}")
+        print(f"  rss {before:.1f}MB -> {rss_mb():.1f}MB")
+
+async def bench_shell(runs=300, cmd="echo toss"):
+    t = time.perf_counter()
+    for _ in range(runs): subprocess.run(cmd, shell=True, capture_output=True)
+    fork = runs / (time.perf_counter() - t)
+    t = time.perf_counter()
+    for _ in range(runs):
+        proc = await asyncio.create_subprocess_shell(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        await proc.communicate()
+    spawn = runs / (time.perf_counter() - t)
+    session = main.ShellSession()
+    await session.run("true", lambda out: None)
+    t = time.perf_counter()
+    for _ in range(runs): await session.run(cmd, lambda out: None)
+    persistent = runs / (time.perf_counter() - t)
+    session.close()
+    print(f"shell: {runs}x {cmd!r}")
+    print(f"  subprocess.run {fork:.0f}/s | asyncio spawn {spawn:.0f}/s | ShellSession {persistent:.0f}/s ({persistent / fork:.1f}x)")
+
+async def bench_pty(seconds=5.0):
+    cmd = "htop -d 2" if shutil.which("htop") else "top -d 0.2"
+    frames, rows = [], []
+    class TimedPty(main.PtyView):
+        def render_lines(self, crop):
+            t = time.perf_counter()
+            strips = super().render_lines(crop)
+            frames.append(time.perf_counter() - t)
+            return strips
+        def render_line(self, y):
+            rows.append(y)
+            return super().render_line(y)
+    class Host(App):
+        CSS = "TimedPty { width: 1fr; height: 100%; }"
+        def compose(self):
+            with Horizontal(): yield TimedPty(cmd); yield TimedPty(cmd)
+    async with Host().run_test(size=(200, 50)) as pilot:
+        await pilot.pause(1.0)
+        frames.clear(); rows.clear()
+        await pilot.pause(seconds)
+        total = sum(v.vt.lines for v in pilot.app.query(TimedPty))
+        print(f"pty: {cmd!r} in 2 windows for {seconds:.0f}s")
+        print(f"  {len(frames)} widget frames, per frame {summary(frames)}")
+        print(f"  {len(rows) / max(1, len(frames)):.1f} rows redrawn per frame of {total // 2}")
+
+async def bench_idle(seconds=20.0):
+    proc = psutil.Process()
+    async with main.TOSS().run_test(size=(160, 45)) as pilot:
+        await pilot.pause(1.0)
+        cpu, t = sum(proc.cpu_times()[:2]), time.perf_counter()
+        await pilot.pause(seconds)
+        used, wall = sum(proc.cpu_times()[:2]) - cpu, time.perf_counter() - t
+    print(f"idle: {seconds:.0f}s headless TOSS")
+    print(f"  {used / wall * 100:.2f}% of one core ({used * 1000:.0f}ms cpu)")
+
+async def bench_retile(windows=200):
+    async with main.TOSS().run_test(size=(240, 70)) as pilot:
+        app = pilot.app
+        await pilot.pause(0.5)
+        ws = app.workspaces[1]
+        await ws.mount_all([main.FloatingTerminal(ws_owner=1, classes="tiling-win") for _ in range(windows - 1)])
+        await pilot.pause()
+        print(f"retile: {windows} windows")
+        for label, step in (("first pass", None), ("unchanged", None), ("grow master", lambda: app.action_resize_master(0.05)),
+                            ("close one", None), ("cycle layout", app.action_cycle_layout), ("unchanged", None)):
+            if label == "close one": await ws.children[-1].remove()
+            app.layout_passes = app.style_writes = 0
+            t = time.perf_counter()
+            step() if step else app.retile_dwm()
+            took = time.perf_counter() - t
+            print(f"  {label:12} {took * 1000:7.2f}ms {app.layout_passes} passes {app.style_writes} style writes")
+        print(f"  {main.layout_geometry.cache_info()}")
+
+async def bench_workspaces(workspaces=12, terminals=20, lines=2000, hibernate=True):
+    filler = "".join(f"line {i:05d} the quick brown fox jumps over the lazy dog\n" for i in range(lines))
+    async with main.TOSS().run_test(size=(200, 60)) as pilot:
+        app = pilot.app
+        await pilot.pause(0.5)
+        rss = [rss_mb()]
+        for n in range(2, workspaces + 2):
+            await app.action_switch_ws(n)
+            terms = [main.FloatingTerminal(ws_owner=n, classes="tiling-win") for _ in range(terminals)]
+            await app.workspaces[n].mount_all(terms)
+            for term in terms: term.write(filler)
+            app.retile_dwm()
+            await pilot.pause()
+            # Stand-in for HIBERNATE_AFTER expiring on the workspace we just left.
+            if hibernate and n > 2: await app.hibernate_ws(n - 1)
+            rss.append(rss_mb())
+        samples = []
+        for n in range(2, workspaces + 2):
+            t = time.perf_counter()
+            await app.action_switch_ws(n)
+            await pilot.pause()
+            samples.append(time.perf_counter() - t)
+            if hibernate: await app.hibernate_ws(n - 1 if n > 2 else workspaces + 1)
+        mode = "hibernating" if hibernate else "all mounted"
+        print(f"workspaces ({mode}): {workspaces} x {terminals} terminals x {lines} lines")
+        print(f"  rss per workspace: {' '.join(f'{r:.0f}' for r in rss)} MB")
+        print(f"  switch {summary(samples)}")
+
+async def bench_workspaces_mounted(): await bench_workspaces(hibernate=False)
+
+# Suite: each scenario drives a fresh headless TOSS through Pilot and returns flat {metric: number}.
+# Metrics ending in _per_s are better when higher, everything else when lower.
+
+STUBS = {
+    "nmcli": 'case "$*" in *DEVICE,TYPE,STATE*) echo "wlan0:wifi:connected"; echo "lo:loopback:unmanaged";; esac',
+    "amixer": 'case "$1" in sget) echo "  Front Left: Playback 41 [64%] [on]";; esac',
+    "brightnessctl": 'case "$1" in -m) echo "stub,backlight,480,80%,600";; esac',
+}
+
+def install_stubs(path) -> None:
+    """Put fake nmcli/amixer/brightnessctl first on PATH and point TOSS's backends at them."""
+    for name, body in STUBS.items():
+        with open(f"{path}/{name}", "w") as f: f.write(f"#!/bin/sh\n{body}\n")
+        os.chmod(f"{path}/{name}", 0o755)
+    os.environ["PATH"] = f"{path}{os.pathsep}{os.environ['PATH']}"
+    os.environ["XDG_DATA_HOME"] = path
+    hwctl.BACKLIGHT, hwctl.alsaaudio = f"{path}/no-backlight", None
+    main.make_net_backend = main.NmcliNetBackend
+
+async def painted(app) -> None:
+    """Wait until everything queued so far has been laid out and drawn."""
+    done = asyncio.get_running_loop().create_future()
+    app.call_after_refresh(done.set_result, None)
+    await done
+
+def booted(size=(200, 60)):
+    class Booted:
+        async def __aenter__(self):
+            self.ctx = main.TOSS().run_test(size=size)
+            pilot = await self.ctx.__aenter__()
+            await pilot.pause(0.5)
+            return pilot
+        async def __aexit__(self, *exc): return await self.ctx.__aexit__(*exc)
+    return Booted()
+
+async def suite_keypress(presses=200) -> dict:
+    # Pilot.press waits for the whole process to go idle (~90ms), so keys are posted directly and
+    # the clock stops once the input has taken the key and the frame showing it is drawn.
+    async with booted() as pilot:
+        box = pilot.app.query_one("#term-input")
+        box.focus()
+        await pilot.pause()
+        samples = []
+        for _ in range(presses):
+            before = box.value
+            t = time.perf_counter()
+            pilot.app.post_message(events.Key("x", "x"))
+            while box.value == before: await asyncio.sleep(0)
+            await painted(pilot.app)
+            samples.append(time.perf_counter() - t)
+    return quantiles(samples)
+
+async def suite_open_close(terminals=20) -> dict:
+    async with booted() as pilot:
+        app, opened, closed = pilot.app, [], []
+        for _ in range(terminals):
+            t = time.perf_counter()
+            await app.action_open_terminal()
+            await painted(app)
+            opened.append(time.perf_counter() - t)
+        for _ in range(terminals):
+            t = time.perf_counter()
+            app.action_close_active_window()
+            await painted(app)
+            closed.append(time.perf_counter() - t)
+    return {**{f"open_{k}": v for k, v in quantiles(opened).items()}, **{f"close_{k}": v for k, v in quantiles(closed).items()}}
+
+async def suite_retile(counts=(10, 50, 100, 200), reps=20) -> dict:
+    result = {}
+    async with booted(size=(240, 70)) as pilot:
+        app, ws = pilot.app, pilot.app.workspaces[1]
+        for count in counts:
+            have = len(ws.children)
+            await ws.mount_all([main.FloatingTerminal(ws_owner=1, classes="tiling-win") for _ in range(count - have)])
+            await painted(app)
+            samples = []
+            for i in range(reps):
+                t = time.perf_counter()
+                app.action_resize_master(0.05 if i % 2 else -0.05)
+                samples.append(time.perf_counter() - t)
+            result[f"w{count}_p50_ms"] = quantiles(samples)["p50_ms"]
+    return result
+
+async def suite_switch_ws(workspaces=4, terminals=5, rounds=5) -> dict:
+    async with booted() as pilot:
+        app = pilot.app
+        for n in range(2, workspaces + 1):
+            await app.action_switch_ws(n)
+            for _ in range(terminals): await app.action_open_terminal()
+            await painted(app)
+        samples = []
+        for _ in range(rounds):
+            for n in range(1, workspaces + 1):
+                t = time.perf_counter()
+                await app.action_switch_ws(n)
+                await painted(app)
+                samples.append(time.perf_counter() - t)
+    return quantiles(samples)
+
+async def suite_output(lines=100_000) -> dict:
+    async with booted() as pilot:
+        app = pilot.app
+        term = app.workspaces[1].query_one(main.FloatingTerminal)
+        box = term.query_one("#term-input")
+        box.focus()
+        box.value = f"seq 1 {lines}"
+        t = time.perf_counter()
+        await pilot.press("enter")
+        await term.job.wait()
+        await painted(app)
+        took = time.perf_counter() - t
+    return {"lines_per_s": round(lines / took), "total_ms": round(took * 1000, 3)}
+
+async def suite_idle(seconds=10.0) -> dict:
+    proc = psutil.Process()
+    async with booted() as pilot:
+        await pilot.pause(1.0)
+        cpu, t = sum(proc.cpu_times()[:2]), time.perf_counter()
+        await pilot.pause(seconds)
+        used, wall = sum(proc.cpu_times()[:2]) - cpu, time.perf_counter() - t
+    return {"cpu_pct": round(used / wall * 100, 3)}
+
+SUITE = {"keypress": suite_keypress, "open_close": suite_open_close, "retile": suite_retile, "switch_ws": suite_switch_ws,
+         "output": suite_output, "idle": suite_idle}
+
+def compare(results, baseline, tolerance, floor_ms=FLOOR_MS) -> list:
+    """Print each metric against the baseline and return the ones worse by more than tolerance (and floor_ms)."""
+    regressions = []
+    for scenario, metrics in results.items():
+        for key, new in metrics.items():
+            old = baseline.get(scenario, {}).get(key)
+            if not old or not new: continue
+            worse = old / new - 1 if key.endswith("_per_s") else new / old - 1
+            noise = key.endswith("_ms") and new - old < floor_ms
+            flag = "  REGRESSED" if worse > tolerance and not noise else ""
+            if flag: regressions.append(f"{scenario}.{key}")
+            print(f"  {scenario + '.' + key:28} {old:12.3f} -> {new:12.3f} {worse * 100:+7.1f}%{flag}")
+    return regressions
+
+def run_suite(argv) -> int:
+    parser = argparse.ArgumentParser(prog="bench.py suite")
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SUITE)} (default: all)")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    parser.add_argument("--repeat", type=int, help=f"run each scenario N times and keep the best of each metric "
+                        f"(default: what the baseline was recorded with, else {REPEAT})")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a metric counts as regressed")
+    parser.add_argument("--floor-ms", type=float, default=FLOOR_MS, help="ignore slowdowns of timings smaller than this")
+    args = parser.parse_args(argv)
+    if unknown := set(args.scenarios) - set(SUITE): parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+    # Best-of-N numbers only compare against a baseline that was also best-of-N.
+    if args.repeat is None: args.repeat = baseline.get("repeat", REPEAT) if baseline else REPEAT
+    elif baseline and baseline.get("repeat", 1) != args.repeat:
+        parser.error(f"{args.baseline} holds best-of-{baseline.get('repeat', 1)} results, "
+                     f"rerun with --repeat {baseline.get('repeat', 1)} or --save-baseline")
+    with tempfile.TemporaryDirectory(prefix="toss-stubs-") as stubs:
+        install_stubs(stubs)
+        results = {}
+        for name in args.scenarios or SUITE:
+            runs = [asyncio.run(SUITE[name]()) for _ in range(args.repeat)]
+            results[name] = {key: (max if key.endswith("_per_s") else min)(run[key] for run in runs) for key in runs[0]}
+            print(f"{name}: {results[name]}")
+    report = {"python": platform.python_version(), "textual": textual.__version__, "machine": platform.machine(),
+              "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat, "results": results}
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump(report, f, indent=2)
+        return 0
+    if not baseline: return 0
+    print(f"against {args.baseline} (best of {args.repeat}, tolerance {args.tolerance:.0%}):")
+    regressions = compare(results, baseline["results"], args.tolerance, args.floor_ms)
+    if regressions: print(f"{len(regressions)} regressed: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+async def bench_complete(executables=20_000, lookups=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        bins = [f"{tmp}/bin{i}" for i in range(20)]
+        for i in range(executables):
+            name = f"{bins[i % 20]}/{'abcdefghij'[i % 10]}{'klmnopqrst'[i // 10 % 10]}cmd-{i}"
+            if i < 20: os.makedirs(bins[i])
+            with open(name, "w"): pass
+            os.chmod(name, 0o755)
+        path = os.pathsep.join(bins)
+        index = main.CommandIndex()
+        t = time.perf_counter(); index.refresh(path); build = time.perf_counter() - t
+        t = time.perf_counter(); index.refresh(path); unchanged = time.perf_counter() - t
+        with open(f"{bins[3]}/znew", "w"): pass
+        os.chmod(f"{bins[3]}/znew", 0o755)
+        os.utime(bins[3], ns=(0, os.stat(bins[3]).st_mtime_ns + 1))
+        t = time.perf_counter(); index.refresh(path); one_dir = time.perf_counter() - t
+        os.environ["PATH"], os.environ["XDG_DATA_HOME"] = path, tmp
+        async with main.TOSS().run_test(size=(160, 45)) as pilot:
+            app = pilot.app
+            await pilot.pause(1.0)
+            box = app.query_one(main.PromptInput)
+            prefixes, samples = ["a", "ak", "bl", "cm", "jt", "akcmd-1", "z", "q"], []
+            for i in range(lookups):
+                box.set_value(prefixes[i % len(prefixes)])
+                t = time.perf_counter()
+                box.action_complete()
+                samples.append(time.perf_counter() - t)
+            print(f"complete: {len(app.commands.names)} names on PATH")
+            print(f"  index build {build * 1000:.1f}ms | unchanged refresh {unchanged * 1000:.2f}ms | one dir changed {one_dir * 1000:.1f}ms")
+            print(f"  tab {summary(samples)}")
+
+BENCHES = {"scrollback": bench_scrollback, "shell": bench_shell, "pty": bench_pty, "idle": bench_idle, "retile": bench_retile, "workspaces": bench_workspaces,
+           "workspaces-mounted": bench_workspaces_mounted, "complete": bench_complete}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["suite"]: sys.exit(run_suite(sys.argv[2:]))
+    names = sys.argv[1:] or list(BENCHES)
+    if len(names) == 1: asyncio.run(BENCHES[names[0]]())
+    else:
+        # One process per benchmark so RSS readings do not leak between them.
+        for name in names: subprocess.run([sys.executable, __file__, name])
@@ -1,17 +1,22 @@
 #!/usr/bin/env bash
 
+# Pakai backend hardware yang sama dengan TOSS (hwctl.py)
+TOSS_DIR="$(dirname "$(readlink -f "$0")")"
+hwctl() { python3 "$TOSS_DIR/hwctl.py" "$@"; }
+
 # Sembunyikan kursor dan bersihkan layar saat keluar
 trap "tput cnorm; clear; exit" EXIT
 tput civis
 
 while true; do
     # Ambil data volume & kecerahan
-    VOL=$(amixer sget Master | grep -Po '\[\d+%\]' | head -1 | tr -d '[]%')
-    BRIGHT=$(brightnessctl info | grep -Po '\d+(?=%)' | head -1)
+    VOL=$(hwctl get vol)
+    BRIGHT=$(hwctl get bri)
     
     # Skala bar (tinggi 20 baris)
-    V_BAR=$((VOL / 5))
-    B_BAR=$((BRIGHT / 5))
+    # Kosong kalau hwctl gagal membaca: bar kosong, label "--"
+    V_BAR=$((${VOL:-0} / 5))
+    B_BAR=$((${BRIGHT:-0} / 5))
     
     clear
     COLS=$(tput cols)
@@ -39,7 +44,7 @@ while true; do
 
     # Bottom Border (Tutup Bawah)
     printf "%*s ├───┤   ├───┤\n" $((COLS/2 - 7)) ""
-    printf "%*s │%02d │   │%02d │\n" $((COLS/2 - 7)) "" "$VOL" "$BRIGHT"
+    printf "%*s │%2s │   │%2s │\n" $((COLS/2 - 7)) "" "${VOL:---}" "${BRIGHT:---}"
     printf "%*s └───┘   └───┘\n" $((COLS/2 - 7)) ""
     printf "%*s <Vol>   <Bri>\n" $((COLS/2 - 7)) ""
     
@@ -49,10 +54,10 @@ while true; do
     # Kontrol Input
     read -rsn1 key
     case $key in
-        w|W) amixer sset Master 5%+ > /dev/null ;;
-        s|S) amixer sset Master 5%- > /dev/null ;;
-        i|I) brightnessctl set +5% > /dev/null ;;
-        k|K) brightnessctl set 5%- > /dev/null ;;
+        w|W) hwctl up vol 5 > /dev/null ;;
+        s|S) hwctl down vol 5 > /dev/null ;;
+        i|I) hwctl up bri 5 > /dev/null ;;
+        k|K) hwctl down bri 5 > /dev/null ;;
         q|Q) break ;;
     esac
 done
@@ -0,0 +1,140 @@
+"""Brightness/volume backend shared by TOSS (BrivolMenu) and brivol.sh.
+
+Usage: python3 hwctl.py get bri|vol
+       python3 hwctl.py set bri|vol LEVEL
+       python3 hwctl.py up|down bri|vol [STEP]
+"""
+import asyncio
+import glob
+import re
+import subprocess
+import sys
+
+try: import alsaaudio
+except ImportError: alsaaudio = None
+
+BACKLIGHT = "/sys/class/backlight"
+MIXER = "Master"
+
+def clamp(level): return max(0, min(100, int(level)))
+
+def run(*args):
+    try: return subprocess.run(args, capture_output=True, text=True).stdout
+    except OSError: return ""
+
+class SysfsBacklight:
+    """Reads and writes /sys/class/backlight/<dev>/brightness; falls back to brightnessctl without write access."""
+    def __init__(self, path):
+        self.path = path
+        with open(f"{path}/max_brightness") as f: self.max = max(1, int(f.read()))
+
+    def read(self):
+        with open(f"{self.path}/brightness") as f: return round(int(f.read()) * 100 / self.max)
+
+    def write(self, level):
+        try:
+            with open(f"{self.path}/brightness", "w") as f: f.write(str(round(clamp(level) * self.max / 100)))
+        except PermissionError: BrightnessctlBacklight().write(level)
+
+class BrightnessctlBacklight:
+    def read(self):
+        fields = run("brightnessctl", "-m").strip().split(",")
+        return int(fields[3].rstrip("%")) if len(fields) > 3 else None
+
+    def write(self, level): run("brightnessctl", "-q", "set", f"{clamp(level)}%")
+
+class AlsaMixer:
+    """Talks to the ALSA mixer through pyalsaaudio, no process per change."""
+    def __init__(self, control=MIXER):
+        self.mixer = alsaaudio.Mixer(control)
+
+    def read(self): return int(self.mixer.getvolume()[0])
+    def write(self, level): self.mixer.setvolume(clamp(level))
+
+class AmixerMixer:
+    def __init__(self, control=MIXER):
+        self.control = control
+
+    def read(self):
+        match = re.search(r"\[(\d+)%\]", run("amixer", "sget", self.control))
+        return int(match.group(1)) if match else None
+
+    def write(self, level): run("amixer", "-q", "sset", self.control, f"{clamp(level)}%")
+
+class MockChannel:
+    """In-memory channel for headless tests; writes keeps every level that reached the 'hardware'."""
+    def __init__(self, level=50):
+        self.level, self.writes = level, []
+
+    def read(self): return self.level
+
+    def write(self, level):
+        self.level = clamp(level)
+        self.writes.append(self.level)
+
+def backlight():
+    devices = sorted(glob.glob(f"{BACKLIGHT}/*"))
+    if devices:
+        try: return SysfsBacklight(devices[0])
+        except (OSError, ValueError): pass
+    return BrightnessctlBacklight()
+
+def mixer():
+    if alsaaudio is not None:
+        try: return AlsaMixer()
+        except alsaaudio.ALSAAudioError: pass
+    return AmixerMixer()
+
+class Coalescer:
+    """Applies only the latest requested level; a burst that lands while a write is in flight collapses into one."""
+    def __init__(self, channel):
+        self.channel, self.target, self.task = channel, None, None
+
+    def set(self, level) -> None:
+        self.target = clamp(level)
+        if self.task is None or self.task.done(): self.task = asyncio.create_task(self.drain())
+
+    async def drain(self) -> None:
+        while self.target is not None:
+            level, self.target = self.target, None
+            try: await asyncio.to_thread(self.channel.write, level)
+            except (OSError, ValueError): pass
+
+class Hardware:
+    def __init__(self, bri=None, vol=None):
+        self.channels = {"bri": bri or backlight(), "vol": vol or mixer()}
+        self.pending = {name: Coalescer(ch) for name, ch in self.channels.items()}
+
+    def read(self, name):
+        try: return self.channels[name].read()
+        except (OSError, ValueError, IndexError): return None
+
+    async def read_all(self) -> dict:
+        return {name: await asyncio.to_thread(self.read, name) for name in self.channels}
+
+    def set(self, name, level) -> None:
+        self.pending[name].set(level)
+
+    async def flush(self) -> None:
+        await asyncio.gather(*(c.task for c in self.pending.values() if c.task))
+
+def main(argv):
+    usage = __doc__.split("\n\n", 1)[1]
+    op, name, args = argv[0] if argv else "", argv[1] if len(argv) > 1 else "", argv[2:]
+    arity = {"get": (0,), "set": (1,), "up": (0, 1), "down": (0, 1)}
+    if name not in ("bri", "vol") or len(args) not in arity.get(op, ()): sys.exit(usage)
+    try: amount = int(args[0]) if args else 5
+    except ValueError: sys.exit(usage)
+    channel = backlight() if name == "bri" else mixer()
+    if op == "set": level = clamp(amount)
+    else:
+        # An unreadable level is not 0%: printing it would empty brivol.sh's bars and stepping from it
+        # would drop the real level to 5%.
+        try: level = channel.read()
+        except (OSError, ValueError, IndexError): level = None
+        if level is None: sys.exit(f"hwctl: cannot read {name}")
+        if op != "get": level = clamp(level + (amount if op == "up" else -amount))
+    if op != "get": channel.write(level)
+    print(level)
+
+if __name__ == "__main__": main(sys.argv[1:])
@@ -1,13 +1,93 @@
-import psutil
+import time
+STARTED = time.perf_counter()
 import os
+import re
+import signal
 import subprocess
 import asyncio
+import codecs
+import importlib.util
+import json
+import math
+import fcntl
+import struct
+import sys
+import termios
+import threading
+import secrets
+import shlex
+import shutil
+import socket
+from array import array
+from bisect import bisect_left
+from collections import deque
 from datetime import datetime
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import NamedTuple
+from rich.cells import cell_len
+from rich.markup import escape
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, Container, Vertical
-from textual.widgets import Static, Label, Input, Button
+from textual.widgets import Static, Label, Input, Button, OptionList
+from textual.widgets.option_list import Option
 from textual.binding import Binding
-from textual.events import MouseDown, MouseMove, MouseUp, Key
+from textual.events import MouseDown, MouseMove, MouseUp, Key, Resize
+from textual.cache import LRUCache
+from textual.geometry import Region, Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widget import Widget
+from hwctl import Hardware
+
+# pyte and psutil are imported where they are first used so they stay off the startup path.
+HAS_PYTE = importlib.util.find_spec("pyte") is not None
+
+MAX_JOBS = 4
+SCROLLBACK_LINES = 10000
+METRIC_RATES = {"cpu": 2.0, "ram": 2.0, "swap": 10.0, "disk": 2.0, "net": 2.0, "battery": 30.0}
+METRIC_HISTORY = 60
+SPARK = "▁▂▃▄▅▆▇█"
+SYS_NET = "/sys/class/net"
+RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV6_IFADDR = 0x1, 0x10, 0x100
+NMCLI_POLL = 5
+FLOAT_SIZE = (80, 24)
+HIBERNATE_AFTER = 300
+MASTER_RATIO = 0.6
+HANDLER_HISTORY = 256
+LAG_INTERVAL = 0.25
+SLOW_HANDLER = 0.016
+TRACE_EVERY = 10.0
+PROFILE_ROWS = 12
+LOOP_LAG = "event loop lag"
+TOAST_STACK = 3
+TOAST_GAP = 0.25
+TOAST_WIDTH = 32
+BATTERY_LOW = 15
+WIFI_SCAN_EVERY = 60
+WIFI_STALE = 30
+WIFI_LOG_LINES = 4
+WIFI_WAIT = 30
+HISTORY_LINES = 10000
+HISTORY_FLUSH = 5.0
+INDEX_CHECK_EVERY = 5.0
+COMPLETE_SHOW = 60
+COMPLETE_SCAN = 5000  # directory entries Tab looks at, on the UI thread
+PROMPT = "toss#nixos $ "
+CONTROL_CHARS = re.compile("[\x00-\x08\x0b-\x1f\x7f]")
+TUI_COMMANDS = ["vi", "vim", "ranger", "htop", "ytfzf", "links", "elinks", "w3m"]
+ALIASES = {"tosser": "links https://duckduckgo.com/lite", "tfiler": "ranger"}
+PTY_KEYS = {
+    "up": "\x1b[A", "down": "\x1b[B", "right": "\x1b[C", "left": "\x1b[D", "home": "\x1b[H", "end": "\x1b[F",
+    "pageup": "\x1b[5~", "pagedown": "\x1b[6~", "insert": "\x1b[2~", "delete": "\x1b[3~", "escape": "\x1b",
+    "enter": "\r", "tab": "\t", "shift+tab": "\x1b[Z", "backspace": "\x7f",
+    "f1": "\x1bOP", "f2": "\x1bOQ", "f3": "\x1bOR", "f4": "\x1bOS", "f5": "\x1b[15~", "f6": "\x1b[17~",
+    "f7": "\x1b[18~", "f8": "\x1b[19~", "f9": "\x1b[20~", "f10": "\x1b[21~", "f11": "\x1b[23~", "f12": "\x1b[24~",
+}
 
 DIGITS = {
     "0": ["███", "█ █", "█ █", "█ █", "███"], "1": ["  █", "  █", "  █", "  █", "  █"],
@@ -25,12 +105,632 @@ def get_ascii_clock(time_str):
         for i in range(5): lines[i] += digit_lines[i] + "  "
     return "\n".join(lines)
 
-class BrivolMenu(Vertical):
+def split(total, parts):
+    """Cut total into parts spans, the remainder going to the last one."""
+    size = total // parts
+    return [(i * size, size if i < parts - 1 else total - i * size) for i in range(parts)]
+
+def layout_tile(count, width, height, ratio, nmaster):
+    nmaster = max(0, min(nmaster, count))
+    if nmaster in (0, count): return [(0, y, width, h) for y, h in split(height, count)]
+    master_w = int(width * ratio)
+    return ([(0, y, master_w, h) for y, h in split(height, nmaster)] +
+            [(master_w, y, width - master_w, h) for y, h in split(height, count - nmaster)])
+
+def layout_monocle(count, width, height, ratio, nmaster):
+    return [(0, 0, width, height)] * count
+
+def layout_grid(count, width, height, ratio, nmaster):
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    geoms = []
+    for r, (y, h) in enumerate(split(height, rows)):
+        in_row = min(cols, count - r * cols)
+        geoms += [(x, y, w, h) for x, w in split(width, in_row)]
+    return geoms
+
+def layout_spiral(count, width, height, ratio, nmaster):
+    x, y, w, h, geoms = 0, 0, width, height, []
+    for i in range(count):
+        if i == count - 1:
+            geoms.append((x, y, w, h))
+            break
+        if i % 2 == 0:
+            cut = int(w * (ratio if i == 0 else 0.5))
+            geoms.append((x, y, cut, h))
+            x, w = x + cut, w - cut
+        else:
+            cut = h // 2
+            geoms.append((x, y, w, cut))
+            y, h = y + cut, h - cut
+    return geoms
+
+def layout_columns(count, width, height, ratio, nmaster):
+    return [(x, 0, w, height) for x, w in split(width, count)]
+
+def layout_float(count, width, height, ratio, nmaster):
+    w, h = FLOAT_SIZE
+    return [((width - w) // 2, (height - h) // 2, w, h)] * count
+
+LAYOUTS = {"tile": layout_tile, "monocle": layout_monocle, "grid": layout_grid,
+           "spiral": layout_spiral, "columns": layout_columns, "float": layout_float}
+
+@lru_cache(maxsize=512)
+def layout_geometry(name, count, width, height, ratio=MASTER_RATIO, nmaster=1):
+    """(x, y, width, height) per window, memoized on the layout inputs."""
+    return tuple(LAYOUTS[name](count, width, height, ratio, nmaster)) if count else ()
+
+def sparkline(values, top=100.0):
+    top = top or 1.0
+    return "".join(SPARK[max(0, min(7, int(v / top * 8)))] for v in values)
+
+def human_rate(v):
+    for unit in "BKMG":
+        if v < 1024: return f"{v:.0f}{unit}"
+        v /= 1024
+    return f"{v:.0f}T"
+
+class Ring:
+    """Fixed-size float history backed by array('f')."""
+    def __init__(self, size=METRIC_HISTORY):
+        self.data, self.pos, self.count = array("f", bytes(4 * size)), 0, 0
+
+    def push(self, value) -> None:
+        self.data[self.pos] = value
+        self.pos = (self.pos + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    def last(self, n=None):
+        n = min(self.count, n or self.count)
+        start = (self.pos - n) % len(self.data)
+        if start + n <= len(self.data): return self.data[start:start + n].tolist()
+        return (self.data[start:] + self.data[:self.pos]).tolist()
+
+    def __bool__(self): return self.count > 0
+
+class MetricSampler(threading.Thread):
+    """Samples psutil metrics off the UI thread, each at its own rate, into Ring buffers.
+
+    on_sample(sampler) is called from this thread after every round that took a sample.
+    """
+    def __init__(self, on_sample, rates=None, history=METRIC_HISTORY):
+        super().__init__(name="toss-metrics", daemon=True)
+        self.on_sample, self.history = on_sample, history
+        self.rates = {k: v for k, v in (rates or METRIC_RATES).items() if v}
+        self.rings, self.counters, self.halt, self.plugged = {}, {}, threading.Event(), None
+
+    def ring(self, name) -> Ring:
+        if name not in self.rings: self.rings[name] = Ring(self.history)
+        return self.rings[name]
+
+    def rate(self, name, total, now) -> float:
+        prev = self.counters.get(name)
+        self.counters[name] = (total, now)
+        return max(0.0, (total - prev[0]) / (now - prev[1])) if prev else 0.0
+
+    def sample(self, name, now) -> None:
+        import psutil
+        if name == "cpu":
+            cores = psutil.cpu_percent(percpu=True)
+            for i, v in enumerate(cores): self.ring(f"cpu{i}").push(v)
+            self.ring("cpu").push(sum(cores) / max(1, len(cores)))
+        elif name == "ram": self.ring("ram").push(psutil.virtual_memory().percent)
+        elif name == "swap": self.ring("swap").push(psutil.swap_memory().percent)
+        elif name == "disk":
+            io = psutil.disk_io_counters()
+            if io: self.ring("disk").push(self.rate("disk", io.read_bytes + io.write_bytes, now))
+        elif name == "net":
+            io = psutil.net_io_counters()
+            self.ring("net").push(self.rate("net", io.bytes_sent + io.bytes_recv, now))
+        elif name == "battery":
+            bat = psutil.sensors_battery()
+            if bat:
+                self.ring("battery").push(bat.percent)
+                self.plugged = bat.power_plugged
+            else: self.rates.pop("battery")
+
+    def run(self) -> None:
+        import psutil
+        psutil.cpu_percent(percpu=True)
+        due = dict.fromkeys(self.rates, time.monotonic())
+        while not self.halt.is_set():
+            now = time.monotonic()
+            for name in [n for n, t in due.items() if t <= now]:
+                try: self.sample(name, now)
+                except (psutil.Error, OSError, AttributeError): pass
+                if name in self.rates: due[name] = now + self.rates[name]
+                else: del due[name]
+            self.on_sample(self)
+            if not due: return
+            self.halt.wait(max(0.0, min(due.values()) - time.monotonic()))
+
+    def stop(self) -> None: self.halt.set()
+
+class RemoteMetrics:
+    """Rings fed with the core daemon's samples, shaped like MetricSampler for TOSS.on_metrics."""
+    def __init__(self, history=METRIC_HISTORY):
+        self.rings, self.plugged, self.history = {}, None, history
+
+    def push(self, values: dict, plugged) -> None:
+        for name, value in values.items():
+            if name not in self.rings: self.rings[name] = Ring(self.history)
+            self.rings[name].push(value)
+        self.plugged = plugged
+
+class HandlerProfile:
+    """Rolling per-handler timings plus event-loop lag from a heartbeat, optionally traced to JSONL.
+
+    Trace lines are {"kind": "slow"} for every sample over SLOW_HANDLER and {"kind": "summary"}
+    every TRACE_EVERY seconds and on exit.
+    """
+    def __init__(self, history=HANDLER_HISTORY):
+        self.history, self.rings, self.calls = history, {}, {}
+        self.loop, self.beat, self.due, self.trace, self.next_dump = None, None, 0.0, None, 0.0
+
+    def record(self, name, seconds) -> None:
+        if name not in self.rings: self.rings[name], self.calls[name] = Ring(self.history), 0
+        self.rings[name].push(seconds)
+        self.calls[name] += 1
+        if self.trace and seconds >= SLOW_HANDLER: self.write(kind="slow", name=name, ms=round(seconds * 1000, 3))
+
+    def stats(self, name) -> dict:
+        samples = sorted(self.rings[name].last())
+        pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+        return {"n": self.calls[name], "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": pick(1.0)}
+
+    def slowest(self, n=PROFILE_ROWS) -> list:
+        rows = [(name, self.stats(name)) for name in list(self.rings) if name != LOOP_LAG]
+        return sorted(rows, key=lambda row: row[1]["p95_ms"], reverse=True)[:n]
+
+    def start(self, loop) -> None:
+        self.loop, self.due = loop, loop.time() + LAG_INTERVAL
+        self.beat = loop.call_at(self.due, self.heartbeat)
+
+    def heartbeat(self) -> None:
+        now = self.loop.time()
+        self.record(LOOP_LAG, max(0.0, now - self.due))
+        self.due = now + LAG_INTERVAL
+        self.beat = self.loop.call_at(self.due, self.heartbeat)
+        if self.trace and now >= self.next_dump:
+            self.next_dump = now + TRACE_EVERY
+            self.dump()
+
+    def stop(self) -> None:
+        if self.beat: self.beat.cancel()
+        self.beat = None
+        if self.trace:
+            self.dump()
+            self.trace.close()
+            self.trace = None
+
+    def open_trace(self, path) -> None: self.trace = open(path, "a")
+
+    def write(self, **record) -> None: self.trace.write(json.dumps({"t": round(time.time(), 3), **record}) + "\n")
+
+    def dump(self) -> None:
+        self.write(kind="summary", stats={name: self.stats(name) for name in list(self.rings)})
+        self.trace.flush()
+
+PROFILE = HandlerProfile()
+
+def timed(name):
+    """Record every call of the wrapped function (sync or async) under name in PROFILE."""
+    def wrap(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def timed_async(*args, **kwargs):
+                t = time.perf_counter()
+                try: return await fn(*args, **kwargs)
+                finally: PROFILE.record(name, time.perf_counter() - t)
+            return timed_async
+        @wraps(fn)
+        def timed_sync(*args, **kwargs):
+            t = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: PROFILE.record(name, time.perf_counter() - t)
+        return timed_sync
+    return wrap
+
+def instrumented(*extra):
+    """Class decorator timing every on_*/action_* method, plus the named ones, as Class.method."""
+    def wrap(cls):
+        for attr, fn in list(vars(cls).items()):
+            if callable(fn) and not isinstance(fn, type) and (attr.startswith(("on_", "action_")) or attr in extra):
+                setattr(cls, attr, timed(f"{cls.__name__}.{attr}")(fn))
+        return cls
+    return wrap
+
+class Metrics(NamedTuple):
+    recent: dict  # metric name -> its last few samples, copied off the sampler thread
+
+class NetChanged(NamedTuple):
+    iface: str
+    up: bool
+    wireless: bool
+
+class Battery(NamedTuple):
+    percent: int
+    plugged: bool | None
+
+class Levels(NamedTuple):
+    bri: int
+    vol: int
+
+class EventBus:
+    """In-process pub/sub keyed by event type.
+
+    publish() never runs subscribers inline: each is scheduled on the loop (coroutines become tasks),
+    so publishers never wait and one failing subscriber cannot starve the rest. Other threads hop
+    over with loop.call_soon_threadsafe(bus.publish, event).
+    """
+    def __init__(self):
+        self.subscribers, self.tasks = {}, set()
+
+    def subscribe(self, kind, handler):
+        """Returns a callable that undoes the subscription."""
+        self.subscribers.setdefault(kind, []).append(handler)
+        return lambda: self.subscribers[kind].remove(handler)
+
+    def publish(self, event) -> None:
+        loop = asyncio.get_running_loop()
+        for handler in self.subscribers.get(type(event), ()): loop.call_soon(self.deliver, handler, event)
+
+    def deliver(self, handler, event) -> None:
+        if handler not in self.subscribers.get(type(event), ()): return
+        result = handler(event)
+        if asyncio.iscoroutine(result):
+            task = asyncio.ensure_future(result)
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+class NetBackend:
+    """Tracks link state per interface and calls on_change(iface, up) when one flips."""
+    def __init__(self):
+        self.states, self.on_change = {}, None
+
+    async def start(self, on_change) -> None:
+        self.on_change = on_change
+        self.update(await self.read_states(), notify=False)
+
+    async def read_states(self) -> dict: return dict(self.states)
+    def stop(self) -> None: pass
+
+    def update(self, states: dict, notify=True) -> None:
+        old, self.states = self.states, states
+        if not notify or not self.on_change: return
+        for iface in sorted(set(old) | set(states)):
+            if old.get(iface, False) != states.get(iface, False): self.on_change(iface, states.get(iface, False))
+
+    def is_wireless(self, iface) -> bool:
+        return os.path.exists(f"{SYS_NET}/{iface}/wireless") or iface.startswith("w")
+
+    @property
+    def connected(self) -> bool: return any(self.states.values())
+
+class SysfsNetBackend(NetBackend):
+    """Reads /sys/class/net/*/operstate, woken by rtnetlink link/address events instead of a timer."""
+    def __init__(self):
+        super().__init__()
+        self.sock = None
+
+    async def start(self, on_change) -> None:
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK, socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        asyncio.get_running_loop().add_reader(self.sock, self.on_netlink)
+        await super().start(on_change)
+
+    async def read_states(self) -> dict:
+        return self.scan()
+
+    def scan(self) -> dict:
+        states = {}
+        for iface in os.listdir(SYS_NET):
+            # Only real hardware: skips lo, bridges, veths and tunnels.
+            if not os.path.exists(f"{SYS_NET}/{iface}/device"): continue
+            try:
+                with open(f"{SYS_NET}/{iface}/operstate") as f: states[iface] = f.read().strip() == "up"
+            except OSError: pass
+        return states
+
+    def on_netlink(self) -> None:
+        try:
+            while self.sock.recv(65536): pass
+        except (BlockingIOError, InterruptedError): pass
+        except OSError: pass
+        self.update(self.scan())
+
+    def stop(self) -> None:
+        if self.sock is None: return
+        asyncio.get_running_loop().remove_reader(self.sock)
+        self.sock.close()
+        self.sock = None
+
+class NmcliNetBackend(NetBackend):
+    """Fallback for systems without rtnetlink: polls one nmcli process every NMCLI_POLL seconds."""
+    def __init__(self, interval=NMCLI_POLL):
+        super().__init__()
+        self.interval, self.task = interval, None
+
+    async def start(self, on_change) -> None:
+        await super().start(on_change)
+        self.task = asyncio.create_task(self.poll())
+
+    async def read_states(self) -> dict:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "nmcli", "-t", "-f", "DEVICE,TYPE,STATE", "dev", stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            out, _ = await proc.communicate()
+        except OSError: return {}
+        states = {}
+        for line in out.decode(errors="replace").splitlines():
+            dev, kind, state = (line.split(":") + ["", ""])[:3]
+            if dev and kind not in ("loopback", "bridge", "tun", "wifi-p2p"): states[dev] = state == "connected"
+        return states
+
+    async def poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.update(await self.read_states())
+
+    def stop(self) -> None:
+        if self.task: self.task.cancel()
+
+class FakeNetBackend(NetBackend):
+    """In-memory backend for tests and machines without NetworkManager: drive it with set()."""
+    def __init__(self, states=None):
+        super().__init__()
+        self.initial = dict(states or {})
+
+    async def read_states(self) -> dict: return dict(self.initial)
+    def is_wireless(self, iface) -> bool: return iface.startswith("w")
+
+    def set(self, iface, up: bool) -> None:
+        self.update({**self.states, iface: up})
+
+def make_net_backend() -> NetBackend:
+    if hasattr(socket, "AF_NETLINK") and os.path.isdir(SYS_NET): return SysfsNetBackend()
+    if shutil.which("nmcli"): return NmcliNetBackend()
+    return FakeNetBackend()
+
+async def start_net_backend(net, on_change) -> NetBackend:
+    """Start net, or nmcli (else the fake) when its netlink socket cannot be opened; returns the one running."""
+    try: await net.start(on_change)
+    except OSError:
+        net = NmcliNetBackend() if shutil.which("nmcli") else FakeNetBackend()
+        await net.start(on_change)
+    return net
+
+class Network(NamedTuple):
+    ssid: str
+    signal: int
+    security: str
+    active: bool
+
+def nmcli_fields(line) -> list:
+    """Split one `nmcli -t` line on its unescaped colons."""
+    return [f.replace("\\:", ":").replace("\\\\", "\\") for f in re.split(r"(?<!\\):", line)]
+
+class WifiBackend:
+    """Scan and join Wi-Fi networks; progress(line) receives status lines as they happen."""
+    async def interfaces(self) -> list: return []
+    async def scan(self, iface, rescan=False) -> list: return []
+    async def connect(self, iface, ssid, password, progress) -> bool: return False
+    async def deep_connect(self, iface, ssid, password, progress) -> bool: return False
+
+class NmcliWifi(WifiBackend):
+    """NetworkManager through nmcli, always exec'd with an argument list: SSIDs and passwords never meet a shell."""
+    async def run(self, *args, progress=None) -> tuple:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "nmcli", *args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError as e:
+            if progress: progress(str(e))
+            return 127, []
+        lines = []
+        while line := await proc.stdout.readline():
+            lines.append(line.decode(errors="replace").rstrip())
+            if progress and lines[-1]: progress(lines[-1])
+        return await proc.wait(), lines
+
+    async def interfaces(self) -> list:
+        _, lines = await self.run("-t", "-f", "DEVICE,TYPE", "device")
+        return [f[0] for f in map(nmcli_fields, lines) if len(f) > 1 and f[1] == "wifi"]
+
+    async def scan(self, iface, rescan=False) -> list:
+        _, lines = await self.run("-t", "-f", "IN-USE,SSID,SIGNAL,SECURITY", "device", "wifi", "list",
+                                  "ifname", iface, "--rescan", "yes" if rescan else "no")
+        best = {}
+        for fields in map(nmcli_fields, lines):
+            if len(fields) < 4 or not fields[1] or not fields[2].isdigit(): continue
+            net = Network(fields[1], int(fields[2]), fields[3].replace("--", "").strip(), fields[0] == "*")
+            if net.ssid not in best or (net.active, net.signal) > (best[net.ssid].active, best[net.ssid].signal): best[net.ssid] = net
+        return sorted(best.values(), key=lambda n: (not n.active, -n.signal))
+
+    async def connect(self, iface, ssid, password, progress) -> bool:
+        if not password:
+            status, _ = await self.run("-w", str(WIFI_WAIT), "device", "wifi", "connect", ssid, "ifname", iface, progress=progress)
+            return status == 0
+        # A key in argv is readable by every user through ps: reuse or create the profile without it instead.
+        status, _ = await self.run("-t", "connection", "show", "id", ssid)
+        if status and not await self.add_profile(iface, ssid, password, progress): return False
+        return await self.up(iface, ssid, password, progress)
+
+    async def deep_connect(self, iface, ssid, password, progress) -> bool:
+        """Recreate the connection profile from scratch, then bring it up."""
+        await self.run("connection", "delete", "id", ssid)
+        return await self.add_profile(iface, ssid, password, progress) and await self.up(iface, ssid, password, progress)
+
+    async def add_profile(self, iface, ssid, password, progress) -> bool:
+        secured = ["--", "wifi-sec.key-mgmt", "wpa-psk"] if password else []
+        status, _ = await self.run("connection", "add", "type", "wifi", "con-name", ssid, "ifname", iface, "ssid", ssid,
+                                   *secured, progress=progress)
+        return status == 0
+
+    async def up(self, iface, ssid, password, progress) -> bool:
+        """Bring the profile up, nmcli reading its key from a 0600 file that only lives for the call."""
+        import tempfile
+        with tempfile.NamedTemporaryFile("w", prefix="toss-psk-") as f:
+            f.write(f"802-11-wireless-security.psk:{password}\n" if password else "")
+            f.flush()
+            secret = ["passwd-file", f.name] if password else []
+            status, _ = await self.run("-w", str(WIFI_WAIT), "connection", "up", "id", ssid, "ifname", iface, *secret, progress=progress)
+        return status == 0
+
+class FakeWifi(WifiBackend):
+    """Scripted networks for tests: passwords maps SSID to its key, SSIDs in broken only join through Deep Connect."""
+    def __init__(self, networks=(), passwords=None, broken=(), ifaces=("wlan0",), delay=0.0):
+        self.networks, self.passwords, self.broken = list(networks), dict(passwords or {}), set(broken)
+        self.ifaces, self.delay, self.active, self.calls = list(ifaces), delay, None, []
+
+    async def interfaces(self) -> list: return list(self.ifaces)
+
+    async def scan(self, iface, rescan=False) -> list:
+        self.calls.append(("scan", iface, rescan))
+        await asyncio.sleep(self.delay)
+        return [n._replace(active=n.ssid == self.active) for n in self.networks]
+
+    async def join(self, kind, iface, ssid, password, progress) -> bool:
+        self.calls.append((kind, iface, ssid, password))
+        progress(f"{kind} {ssid} on {iface}")
+        await asyncio.sleep(self.delay)
+        ok = (kind == "deep_connect" or ssid not in self.broken) and self.passwords.get(ssid, "") == (password or "")
+        progress("Device successfully activated" if ok else "Error: Connection activation failed")
+        if ok: self.active = ssid
+        return ok
+
+    async def connect(self, iface, ssid, password, progress) -> bool: return await self.join("connect", iface, ssid, password, progress)
+    async def deep_connect(self, iface, ssid, password, progress) -> bool: return await self.join("deep_connect", iface, ssid, password, progress)
+
+def make_wifi_backend() -> WifiBackend: return NmcliWifi() if shutil.which("nmcli") else WifiBackend()
+
+class StatsLabel(Widget):
+    """Taskbar text that only asks for a relayout when its width changes."""
+    def __init__(self, text="", **kwargs):
+        super().__init__(**kwargs)
+        self.text = text
+
+    def update(self, text: str) -> None:
+        relayout = len(text) != len(self.text)
+        self.text = text
+        self.refresh(layout=relayout)
+
+    def get_content_width(self, container, viewport) -> int: return len(self.text)
+    def get_content_height(self, container, viewport, width) -> int: return 1
+    def render(self): return self.text
+
+def format_stats(recent) -> str:
+    parts = []
+    for name, label in (("cpu", "CPU"), ("ram", "RAM"), ("swap", "SWP")):
+        if recent.get(name): parts.append(f"{label} {sparkline(recent[name])} {recent[name][-1]:3.0f}%")
+    for name, label in (("disk", "DSK"), ("net", "NET")):
+        if hist := recent.get(name): parts.append(f"{label} {sparkline(hist, max(hist))} {human_rate(hist[-1]):>4}/s")
+    if recent.get("battery"): parts.append(f"BAT {recent['battery'][-1]:3.0f}%")
+    return " | ".join(parts)
+
+class TaskbarStats(StatsLabel):
+    def on_mount(self) -> None: self.unsubscribe = self.app.bus.subscribe(Metrics, self.show_metrics)
+    def on_unmount(self) -> None: self.unsubscribe()
+
+    def show_metrics(self, event: Metrics) -> None:
+        text = format_stats(event.recent)
+        if text != self.text: self.update(text)
+
+@instrumented("post", "pump")
+class Toaster(Vertical):
+    """Stacks up to TOAST_STACK notifications, queues the rest and shows new ones at most every TOAST_GAP.
+
+    Every toast has a key (its message unless given): posting a key that is already shown or queued
+    replaces that toast's text and restarts its clock instead of adding another. One timer, for the
+    next expiry or queued toast, exists only while something is shown or waiting.
+    """
     def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pending, self.shown, self.next_show, self.timer = {}, {}, 0.0, None
+
+    def post(self, message: str, duration=3, key=None) -> None:
+        key, body = key or message, f"[bold #a6e22e]TOSS NOTIFY[/]\n{message}"
+        if key in self.shown:
+            toast = self.shown[key]
+            if toast[2] != body: toast[0].update(body)
+            toast[1:] = time.monotonic() + duration, body
+        else: self.pending[key] = (body, duration)
+        self.pump()
+
+    def pump(self) -> None:
+        now = time.monotonic()
+        for key, (toast, expires, _) in list(self.shown.items()):
+            if expires <= now:
+                del self.shown[key]
+                toast.remove()
+        if self.pending and len(self.shown) < TOAST_STACK and now >= self.next_show:
+            key = next(iter(self.pending))
+            body, duration = self.pending.pop(key)
+            offset = (self.parent.content_size.width - TOAST_WIDTH - 3, 1)
+            if self.styles.offset != offset: self.styles.offset = offset
+            toast = Static(body, classes="toast")
+            self.mount(toast)
+            self.shown[key] = [toast, now + duration, body]
+            self.next_show = now + TOAST_GAP
+        if self.timer: self.timer.stop()
+        wake = [expires for _, expires, _ in self.shown.values()]
+        if self.pending and len(self.shown) < TOAST_STACK: wake.append(self.next_show)
+        self.timer = self.set_timer(max(0.0, min(wake) - now), self.pump) if wake else None
+
+class ProfileOverlay(Static):
+    """Live table of event-loop lag and the slowest handlers by p95; refreshes only while shown."""
+    def on_mount(self) -> None:
+        self.timer = self.set_interval(1, self.refresh_table, pause=True)
+
+    def toggle(self) -> None:
+        self.display = not self.display
+        if self.display:
+            self.refresh_table()
+            self.timer.resume()
+        else: self.timer.pause()
+
+    def refresh_table(self) -> None:
+        row = lambda name, st: f"{name[:34]:34} {st['n']:>6} {st['p50_ms']:>7.1f} {st['p95_ms']:>7.1f} {st['max_ms']:>7.1f}"
+        lines = [f"[bold]{'handler':34} {'calls':>6} {'p50':>7} {'p95':>7} {'max':>7}[/]  ms"]
+        if LOOP_LAG in PROFILE.rings: lines.append(f"[#a6e22e]{row(LOOP_LAG, PROFILE.stats(LOOP_LAG))}[/]")
+        lines += [row(name, st) for name, st in PROFILE.slowest()]
+        self.update("\n".join(lines))
+
+@instrumented("load_levels")
+class BrivolMenu(Vertical):
+    def __init__(self, hw=None, **kwargs):
         super().__init__(**kwargs)
         self.can_focus = True
+        self.hw = hw
         self.bri, self.vol = 100, 85
         self.focus_target = "bri"
+        self.wanted, self.loading = {}, False
+
+    def on_mount(self) -> None: self.unsubscribe = self.app.bus.subscribe(Levels, self.show_levels)
+    def on_unmount(self) -> None: self.unsubscribe()
+
+    def refresh_levels(self) -> None: self.run_worker(self.load_levels(), exclusive=True)
+
+    async def load_levels(self) -> None:
+        self.loading = True
+        try:
+            if self.hw is None:
+                self.hw = await asyncio.to_thread(Hardware)
+                # Keys pressed while it was being built only moved the bars; now they reach the hardware.
+                for name, level in self.wanted.items(): self.hw.set(name, level)
+            levels = {**await self.hw.read_all(), **self.wanted}
+        finally: self.loading = False
+        self.wanted.clear()
+        self.app.bus.publish(Levels(self.bri if levels["bri"] is None else levels["bri"],
+                                    self.vol if levels["vol"] is None else levels["vol"]))
+
+    def set_level(self, name, level) -> None:
+        if self.hw: self.hw.set(name, level)
+        # Until load_levels is done, a key press also has to outlive the levels it is reading.
+        if self.hw is None or self.loading: self.wanted[name] = level
+
+    def show_levels(self, event: Levels) -> None:
+        self.bri, self.vol = event
+        self.update_bars()
 
     def compose(self) -> ComposeResult:
         yield Label("[bold white]      BRIVOL - TOSS [/]", id="brivol-title")
@@ -63,26 +763,647 @@ class BrivolMenu(Vertical):
             diff = 5 if event.key == "up" else -5
             if self.focus_target == "bri":
                 self.bri = max(0, min(100, self.bri + diff))
-                os.system(f"brightnessctl set {self.bri}% > /dev/null 2>&1")
+                self.set_level("bri", self.bri)
             else:
                 self.vol = max(0, min(100, self.vol + diff))
-                os.system(f"amixer set Master {self.vol}% > /dev/null 2>&1")
+                self.set_level("vol", self.vol)
+            self.app.bus.publish(Levels(self.bri, self.vol))
+            return
         elif event.key == "escape":
             self.app.action_hide_all()
         self.update_bars()
 
+@instrumented("scan", "join")
+class WifiPanel(Vertical):
+    """Native Wi-Fi manager. Scans run every WIFI_SCAN_EVERY seconds whether or not the panel is shown and
+    are cached per interface with their time, so opening it shows the last results at once."""
+    def __init__(self, backend=None, **kwargs):
+        super().__init__(**kwargs)
+        self.backend, self.ifaces, self.iface, self.cache = backend, None, None, {}
+        self.listed, self.target, self.scanner, self.timer = [], None, None, None
+        self.log_lines = deque(maxlen=WIFI_LOG_LINES)
+
+    def compose(self) -> ComposeResult:
+        yield Label("[bold white] WIFI - TOSS [/]", id="wifi-title")
+        yield OptionList(id="wifi-list")
+        yield Input(id="wifi-pass", password=True, placeholder="password", classes="hidden")
+        yield Static("", id="wifi-log")
+        yield Label("[ENTER: JOIN] [R: RESCAN] [TAB: IFACE]", id="wifi-hint")
+
+    def start(self) -> None:
+        self.request_scan()
+        self.timer = self.set_interval(WIFI_SCAN_EVERY, self.request_scan)
+
+    def open(self) -> None:
+        self.add_class("show")
+        self.show_networks()
+        self.query_one(OptionList).focus()
+        stamp = self.cache.get(self.iface, (0.0,))[0]
+        if time.monotonic() - stamp > WIFI_STALE: self.request_scan()
+
+    def request_scan(self, rescan=False) -> None:
+        if self.scanner and self.scanner.is_running and not rescan: return
+        self.scanner = self.run_worker(self.scan(rescan), group="wifi-scan", exclusive=True)
+
+    async def scan(self, rescan=False) -> None:
+        if self.backend is None: self.backend = make_wifi_backend()
+        if self.ifaces is None:
+            self.ifaces = await self.backend.interfaces()
+            self.iface = self.ifaces[0] if self.ifaces else None
+        if self.iface is None:
+            # Nothing to scan on this machine: stop the schedule so an idle TOSS pays nothing for it.
+            if self.timer: self.timer.stop()
+            return self.progress("no Wi-Fi interface (is NetworkManager running?)")
+        iface = self.iface
+        networks = await self.backend.scan(iface, rescan)
+        self.cache[iface] = (time.monotonic(), networks)
+        if self.has_class("show") and iface == self.iface: self.show_networks()
+
+    def show_networks(self) -> None:
+        stamp, self.listed = self.cache.get(self.iface, (None, []))
+        age = "never" if stamp is None else f"{time.monotonic() - stamp:.0f}s ago"
+        self.query_one("#wifi-title").update(f"[bold white] WIFI - TOSS [/] {self.iface or '-'} [#555555]scanned {age}[/]")
+        bars = lambda signal: "▂▄▆█"[:max(1, (signal + 24) // 25)]
+        options = self.query_one(OptionList)
+        highlighted = options.highlighted
+        options.clear_options()
+        options.add_options([Option(f"{'*' if n.active else ' '} {bars(n.signal):4} {n.signal:3d} {escape(n.ssid[:24]):24} {n.security or 'open'}")
+                             for n in self.listed])
+        if self.listed: options.highlighted = min(highlighted or 0, len(self.listed) - 1)
+
+    def progress(self, line: str) -> None:
+        self.log_lines.append(escape(line))
+        self.query_one("#wifi-log").update("\n".join(self.log_lines))
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        event.stop()
+        self.target = self.listed[event.option_index]
+        if not self.target.security or self.target.active: return self.start_join(None)
+        box = self.query_one("#wifi-pass")
+        box.remove_class("hidden")
+        box.focus()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        event.stop()
+        event.input.add_class("hidden")
+        password, event.input.value = event.value, ""
+        self.query_one(OptionList).focus()
+        self.start_join(password)
+
+    def start_join(self, password) -> None:
+        self.run_worker(self.join(self.iface, self.target.ssid, password), group="wifi-join", exclusive=True)
+
+    async def join(self, iface, ssid, password) -> None:
+        self.progress(f"joining {ssid} on {iface}...")
+        ok = await self.backend.connect(iface, ssid, password, self.progress)
+        if not ok:
+            self.progress("standard connect failed, applying Deep Connect...")
+            ok = await self.backend.deep_connect(iface, ssid, password, self.progress)
+        self.progress("connected" if ok else "could not connect")
+        self.app.post_notification(f"✔ Joined {ssid}" if ok else f"✘ Could not join {ssid}", key=f"wifi:{ssid}")
+        if ok: self.request_scan(rescan=True)
+
+    def on_key(self, event: Key) -> None:
+        if event.key == "r": self.request_scan(rescan=True)
+        elif event.key == "tab" and self.ifaces:
+            self.iface = self.ifaces[(self.ifaces.index(self.iface) + 1) % len(self.ifaces)]
+            self.show_networks()
+            if self.iface not in self.cache: self.request_scan()
+        elif event.key == "escape":
+            self.query_one("#wifi-pass").add_class("hidden")
+            self.app.action_hide_all()
+        else: return
+        event.stop()
+        event.prevent_default()
+
+def line_cells(line) -> int:
+    """Cells a scrollback line takes once its tabs are expanded (at most 8 each)."""
+    line = line if isinstance(line, str) else line.plain
+    return cell_len(line) + 7 * line.count("\t")
+
+class Scrollback:
+    """Ring buffer of lines, plain str for command output and rich Text once TOSS markup is involved;
+    the last line stays open for partial writes.
+
+    Command output goes in with markup=False and is never parsed, so a tag split across two reads cannot
+    join back up into live markup; only TOSS's own status lines are markup. markup() escapes whole lines.
+    width is the widest line seen so far, in cells once tabs are expanded.
+    """
+    def __init__(self, max_lines=SCROLLBACK_LINES):
+        self.lines = deque([""], maxlen=max(1, max_lines))
+        self.dropped, self.width = 0, 0
+
+    def __len__(self): return len(self.lines)
+    def __getitem__(self, i): return self.lines[i]
+
+    def markup(self) -> str: return "\n".join(escape(line) if isinstance(line, str) else line.markup for line in self.lines)
+
+    def spill(self, path) -> None:
+        with open(path, "w") as f: f.write(self.markup())
+
+    def append(self, text: str, markup=True) -> int:
+        """Append text, returns how many old lines were evicted."""
+        parts = Text.from_markup(text).split("\n", allow_blank=True) if markup else text.split("\n")
+        head = self.lines[-1]
+        head = self.lines[-1] = head + parts[0] if isinstance(head, str) and isinstance(parts[0], str) else Text.assemble(head, parts[0])
+        # Plain ASCII without tabs is one cell per character, so a big chunk of output costs one C-level max().
+        fast = not markup and text.isascii() and "\t" not in text
+        widest = max(map(len if fast else line_cells, parts[1:]), default=0)
+        self.width = max(self.width, line_cells(head), widest)
+        evicted = max(0, len(self.lines) + len(parts) - 1 - self.lines.maxlen)
+        self.lines.extend(parts[1:])
+        self.dropped += evicted
+        return evicted
+
+class TermLog(ScrollView):
+    """Scrollback view that only renders the lines inside the viewport; long lines scroll sideways."""
+    def __init__(self, text="", max_lines=SCROLLBACK_LINES, **kwargs):
+        super().__init__(**kwargs)
+        self.scrollback = Scrollback(max_lines)
+        self.strips = LRUCache(512)
+        if text: self.scrollback.append(text)
+
+    def on_mount(self) -> None:
+        self.virtual_size = Size(self.scrollback.width, len(self.scrollback))
+
+    def write(self, text: str, markup=True) -> None:
+        sb = self.scrollback
+        at_end = self.is_vertical_scroll_end
+        first = len(sb) - 1
+        self.strips.discard(sb.dropped + first)
+        evicted = sb.append(text, markup)
+        self.virtual_size = Size(sb.width, len(sb))
+        if at_end: self.scroll_end(animate=False, immediate=True)
+        elif evicted: self.scroll_to(y=max(0, self.scroll_y - evicted), animate=False, immediate=True)
+        else: self.refresh_lines(first - int(self.scroll_y), len(sb) - first)
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        idx = int(self.scroll_y) + y
+        sb = self.scrollback
+        if idx >= len(sb): return Strip.blank(width, self.rich_style)
+        # The whole line is cached by absolute line number, so write() can drop the open one; cropping to
+        # the scrolled-to columns happens on every paint.
+        strip = self.strips.get(sb.dropped + idx)
+        if strip is None:
+            line = sb[idx]
+            text = Text(line) if isinstance(line, str) else line.copy()
+            text.expand_tabs()
+            text.style, text.end, text.no_wrap = self.rich_style, "", True
+            strip = self.strips[sb.dropped + idx] = Strip(text.render(self.app.console))
+        x = int(self.scroll_x)
+        return strip.crop_extend(x, x + width, self.rich_style)
+
+class ShellSession:
+    """Long-lived shell fed over pipes; each command ends with a marker line carrying its exit status."""
+    def __init__(self, shell="/bin/sh"):
+        self.shell, self.proc, self.cwd = shell, None, os.getcwd()
+        self.marker = f"__TOSS_{secrets.token_hex(8)}__".encode()
+        self.lock = asyncio.Lock()
+
+    @property
+    def alive(self): return self.proc is not None and self.proc.returncode is None
+
+    async def start(self) -> None:
+        if self.alive: return
+        self.proc = await asyncio.create_subprocess_exec(
+            self.shell, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            cwd=self.cwd, start_new_session=True)
+
+    async def run(self, cmd: str, on_output) -> int | None:
+        """Run one command, streaming output to on_output; None means the shell itself exited."""
+        async with self.lock:
+            await self.start()
+            proc, marker = self.proc, self.marker
+            proc.stdin.write(f"__toss_cmd={shlex.quote(cmd)}\ncommand eval \"$__toss_cmd\" </dev/null\n"
+                             f"printf '\\n%s%d %s\\n' {marker.decode()} $? \"$PWD\"\n".encode())
+            await proc.stdin.drain()
+            decoder, buf, keep = codecs.getincrementaldecoder("utf-8")(errors="replace"), b"", len(marker) + 1
+            while chunk := await proc.stdout.read(4096):
+                buf += chunk
+                end = buf.find(marker)
+                if end < 0:
+                    if len(buf) > keep: on_output(decoder.decode(buf[:-keep])); buf = buf[-keep:]
+                    continue
+                while b"\n" not in buf[end:] and (chunk := await proc.stdout.read(4096)): buf += chunk
+                on_output(decoder.decode(buf[:end].removesuffix(b"\n"), final=True))
+                status, _, cwd = buf[end + len(marker):].partition(b"\n")[0].decode(errors="replace").partition(" ")
+                self.cwd = cwd or self.cwd
+                return int(status)
+            on_output(decoder.decode(buf, final=True))
+            await proc.wait()
+            return None
+
+    def interrupt(self) -> bool:
+        """SIGINT whatever the shell is running, leaving the shell itself alone; False when there was nothing to signal."""
+        if not self.alive: return False
+        import psutil
+        try: children = psutil.Process(self.proc.pid).children(recursive=True)
+        except psutil.Error: return False
+        for child in children:
+            try: child.send_signal(signal.SIGINT)
+            except psutil.Error: pass
+        return bool(children)
+
+    def restart(self) -> None:
+        """For loops the shell runs itself: kill it, and the next command gets a fresh one in cwd."""
+        self.kill()
+        self.proc = None
+
+    def kill(self) -> None:
+        if self.alive:
+            try: os.killpg(self.proc.pid, signal.SIGKILL)
+            except ProcessLookupError: pass
+
+    def close(self) -> None:
+        """Hang up the shell's stdin so it exits on its own, SIGKILL whatever is left after a second."""
+        if not self.alive: return
+        self.interrupt()
+        self.proc.stdin.close()
+        asyncio.get_running_loop().call_later(1, self.kill)
+
+def pty_color(c):
+    if c == "default": return None
+    if re.fullmatch("[0-9a-fA-F]{6}", c): return f"#{c}"
+    return c.replace("brown", "yellow").replace("bright", "bright_")
+
+@lru_cache(maxsize=4096)
+def pty_style(fg, bg, bold, italics, underscore, strikethrough, reverse):
+    return Style(color=pty_color(fg), bgcolor=pty_color(bg), bold=bold, italic=italics,
+                 underline=underscore, strike=strikethrough, reverse=reverse)
+
+# After setsid the shell leads a session with no terminal, and the first tty it opens becomes its
+# controlling one, so reopening the slave by path replaces a preexec_fn (unsafe with threads running).
+TAKE_CTTY = 'exec <>"$TOSS_TTY" >&0 2>&0; unset TOSS_TTY; eval "$1"'
+
+@instrumented()
+class PtyView(Widget, can_focus=True):
+    """Runs a command on a pseudo-terminal through pyte and repaints only the rows it marks dirty."""
+    class Exited(Message):
+        def __init__(self, view, status):
+            super().__init__()
+            self.view, self.status = view, status
+
+    def __init__(self, cmd, cwd=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cmd, self.cwd = cmd, cwd
+        self.fd, self.proc, self.vt, self.stream = None, None, None, None
+        self.cursor_row = 0
+
+    async def on_resize(self, event: Resize) -> None:
+        cols, lines = max(2, event.size.width), max(2, event.size.height)
+        if self.vt is None: await self.spawn(cols, lines)
+        elif (cols, lines) != (self.vt.columns, self.vt.lines):
+            self.vt.resize(lines, cols)
+            if self.fd is not None: self.set_winsize(cols, lines)
+            self.refresh()
+
+    async def spawn(self, cols, lines) -> None:
+        import pyte
+        self.vt = pyte.Screen(cols, lines)
+        self.stream = pyte.ByteStream(self.vt)
+        self.vt.write_process_input = lambda data: self.fd is not None and os.write(self.fd, data.encode())
+        master, slave = os.openpty()
+        self.fd = master
+        self.set_winsize(cols, lines)
+        env = dict(os.environ, TERM="linux", COLUMNS=str(cols), LINES=str(lines), TOSS_TTY=os.ttyname(slave))
+        try:
+            self.proc = await asyncio.create_subprocess_exec(
+                "/bin/sh", "-c", TAKE_CTTY, "sh", self.cmd, stdin=slave, stdout=slave, stderr=slave, cwd=self.cwd, env=env,
+                start_new_session=True)
+        finally:
+            os.close(slave)
+        os.set_blocking(master, False)
+        asyncio.get_running_loop().add_reader(master, self.on_pty_output)
+
+    def set_winsize(self, cols, lines) -> None:
+        fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack("HHHH", lines, cols, 0, 0))
+
+    def on_pty_output(self) -> None:
+        try: data = os.read(self.fd, 65536)
+        except (BlockingIOError, InterruptedError): return
+        except OSError: data = b""
+        if not data: return self.hang_up()
+        self.stream.feed(data)
+        dirty = self.vt.dirty
+        dirty.update((self.cursor_row, self.vt.cursor.y))
+        self.cursor_row = self.vt.cursor.y
+        width = self.size.width
+        self.refresh(*(Region(0, y, width, 1) for y in dirty if y < self.vt.lines))
+        dirty.clear()
+
+    def hang_up(self) -> None:
+        if self.fd is None: return
+        asyncio.get_running_loop().remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        self.run_worker(self.reap())
+
+    async def reap(self) -> None:
+        self.post_message(self.Exited(self, await self.proc.wait()))
+
+    def send(self, data: str) -> None:
+        if self.fd is not None: os.write(self.fd, data.encode())
+
+    def on_key(self, event: Key) -> None:
+        if event.key.startswith("alt+") and any(b.key == event.key for b in self.app.BINDINGS): return
+        data = PTY_KEYS.get(event.key)
+        if data is None and event.key.startswith("alt+") and event.character: data = "\x1b" + event.character
+        data = data or event.character
+        if data:
+            self.send(data)
+            event.stop()
+            event.prevent_default()
+
+    def render_line(self, y: int) -> Strip:
+        width = self.size.width
+        vt = self.vt
+        if vt is None or y >= vt.lines: return Strip.blank(width)
+        line, cursor = vt.buffer[y], vt.cursor
+        cursor_x = cursor.x if y == cursor.y and not cursor.hidden and self.has_focus else -1
+        segments, run, attrs = [], [], None
+        for x in range(vt.columns):
+            ch = line[x]
+            if not ch.data: continue
+            key = (ch.fg, ch.bg, ch.bold, ch.italics, ch.underscore, ch.strikethrough, ch.reverse != (x == cursor_x))
+            if key != attrs:
+                if run: segments.append(Segment("".join(run), pty_style(*attrs)))
+                run, attrs = [], key
+            run.append(ch.data)
+        if run: segments.append(Segment("".join(run), pty_style(*attrs)))
+        return Strip(segments).crop_extend(0, width, None)
+
+    def on_unmount(self) -> None:
+        if self.fd is None: return
+        asyncio.get_running_loop().remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        if self.proc and self.proc.returncode is None:
+            try: os.killpg(self.proc.pid, signal.SIGHUP)
+            except ProcessLookupError: pass
+
+def executables(directory) -> set:
+    try: entries = list(os.scandir(directory))
+    except OSError: return set()
+    return {e.name for e in entries if not e.is_dir() and os.access(e.path, os.X_OK)}
+
+class CommandIndex:
+    """Sorted names of PATH executables and ALIASES, so a prefix lookup is two bisects.
+
+    refresh() re-lists only PATH directories whose mtime changed; it touches the filesystem and belongs
+    in a thread. Readers always see a complete list, the new one replaces it in a single assignment.
+    """
+    def __init__(self, aliases=ALIASES):
+        self.aliases, self.dirs, self.names, self.checked = aliases, {}, sorted(aliases), 0.0
+
+    def refresh(self, path=None) -> bool:
+        dirs = [d for d in dict.fromkeys((path or os.environ.get("PATH", "")).split(os.pathsep)) if d]
+        changed, fresh = set(dirs) != set(self.dirs), {}
+        for d in dirs:
+            try: mtime = os.stat(d).st_mtime_ns
+            except OSError: continue
+            if d in self.dirs and self.dirs[d][0] == mtime: fresh[d] = self.dirs[d]
+            else: fresh[d], changed = (mtime, executables(d)), True
+        self.dirs, self.checked = fresh, time.monotonic()
+        if changed: self.names = sorted(set(self.aliases).union(*(names for _, names in fresh.values())))
+        return changed
+
+    @property
+    def stale(self) -> bool: return time.monotonic() - self.checked > INDEX_CHECK_EVERY
+
+    def complete(self, prefix) -> list:
+        names = self.names
+        return names[bisect_left(names, prefix):bisect_left(names, prefix + "\U0010ffff")]
+
+def complete_path(token, cwd) -> list:
+    """Entries of token's directory (relative to cwd) that start with its last part; directories end in '/'.
+
+    Only the first COMPLETE_SCAN entries are looked at, so a huge directory cannot stall the UI.
+    """
+    tail = token.rpartition("/")[2]
+    head = token[:len(token) - len(tail)]
+    try:
+        with os.scandir(os.path.join(cwd, os.path.expanduser(head or "."))) as it: entries = list(islice(it, COMPLETE_SCAN))
+    except OSError: return []
+    return sorted(head + e.name + ("/" if e.is_dir() else "") for e in entries
+                  if e.name.startswith(tail) and (tail.startswith(".") or not e.name.startswith(".")))
+
+class History:
+    """Command history shared by every terminal, appended to disk in batches.
+
+    Unsaved lines are written HISTORY_FLUSH seconds after the first of them (or on flush()), in append
+    mode so several TOSS instances can share the file.
+    """
+    def __init__(self, path=None, limit=HISTORY_LINES):
+        data = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        self.path, self.limit = path or os.path.join(data, "toss", "history"), limit
+        self.entries, self.pending, self.flusher = [], [], None
+
+    def load(self) -> None:
+        try:
+            with open(self.path, errors="replace") as f: lines = f.read().splitlines()
+        except OSError: return
+        self.entries = lines[-self.limit:] + self.entries
+        if len(lines) > 2 * self.limit:
+            with open(self.path, "w") as f: f.writelines(line + "\n" for line in lines[-self.limit:])
+
+    def add(self, cmd: str) -> None:
+        if self.entries and self.entries[-1] == cmd: return
+        self.entries.append(cmd)
+        if len(self.entries) > self.limit: del self.entries[:len(self.entries) - self.limit]
+        self.pending.append(cmd)
+        if self.flusher is None: self.flusher = asyncio.get_running_loop().call_later(HISTORY_FLUSH, self.flush)
+
+    def flush(self) -> None:
+        if self.flusher: self.flusher.cancel()
+        self.flusher = None
+        if not self.pending: return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f: f.writelines(line + "\n" for line in self.pending)
+        except OSError: pass
+        self.pending = []
+
+    def search(self, query: str, before: int) -> int:
+        """Index of the newest entry before `before` containing query, or -1."""
+        entries = self.entries
+        for i in range(min(before, len(entries)) - 1, -1, -1):
+            if query in entries[i]: return i
+        return -1
+
+class PromptInput(Input):
+    """TOSSMINAL prompt: Tab completes commands and paths, Up/Down walk history, Ctrl+R searches it."""
+    BINDINGS = [
+        Binding("tab", "complete", "Complete", show=False),
+        Binding("up", "history(1)", "Older", show=False),
+        Binding("down", "history(-1)", "Newer", show=False),
+        Binding("ctrl+r", "reverse_search", "Search History", show=False),
+    ]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.back, self.draft, self.search = 0, "", None
+
+    @property
+    def terminal(self): return self.parent.parent
+
+    def set_value(self, value: str) -> None:
+        self.value, self.cursor_position = value, len(value)
+
+    def action_complete(self) -> None:
+        app, head, rest = self.app, self.value[:self.cursor_position], self.value[self.cursor_position:]
+        start = re.search(r"(?:\\ |[^ ])*$", head).start()
+        token = head[start:].replace("\\ ", " ")
+        if head[:start].strip() or "/" in token: matches = complete_path(token, self.terminal.session.cwd)
+        else:
+            if app.commands.stale: app.refresh_commands()
+            matches = app.commands.complete(token)
+        if not matches: return self.app.bell()
+        common = os.path.commonprefix([matches[0], matches[-1]]).replace(" ", "\\ ")
+        if len(matches) == 1 and not common.endswith("/"): common += " "
+        if common != head[start:]:
+            self.value = head[:start] + common + rest
+            self.cursor_position = start + len(common)
+        else:
+            more = f" [#555555](+{len(matches) - COMPLETE_SHOW} more)[/]" if len(matches) > COMPLETE_SHOW else ""
+            self.terminal.write("\n" + "  ".join(escape(m) for m in matches[:COMPLETE_SHOW]) + more)
+
+    def action_history(self, step: int) -> None:
+        entries = self.app.history.entries
+        if not self.back: self.draft = self.value
+        self.back = max(0, min(len(entries), self.back + step))
+        self.set_value(entries[-self.back] if self.back else self.draft)
+
+    def action_reverse_search(self) -> None:
+        history = self.app.history
+        query, before = self.search or (self.value, len(history.entries))
+        found = history.search(query, before)
+        if found < 0: return self.app.bell()
+        self.search = (query, found)
+        self.terminal.query_one("#prompt-label").update(f"(search '{escape(query)}') ")
+        self.set_value(history.entries[found])
+
+    def end_search(self) -> None:
+        self.search = None
+        self.terminal.query_one("#prompt-label").update(PROMPT)
+
+    def on_key(self, event: Key) -> None:
+        if self.search and event.key != "ctrl+r": self.end_search()
+
+    async def action_submit(self) -> None:
+        self.back = 0
+        if self.search: self.end_search()
+        await super().action_submit()
+
+@instrumented("start_job", "run_tui")
 class FloatingTerminal(Vertical):
-    def __init__(self, ws_owner, **kwargs):
+    BINDINGS = [Binding("ctrl+c", "cancel_job", "Cancel", priority=True)]
+
+    def __init__(self, ws_owner, session=None, scrollback=None, geometry=None, text=None, **kwargs):
         super().__init__(**kwargs)
         self.ws_owner = ws_owner
         self.dragging = False
+        self.job, self.session, self.pty = None, session or ShellSession(), None
+        self.interrupted = False
+        self.geometry, self.spilled, self.text, self.backlog = geometry, scrollback, text, []
+        if geometry:
+            x, y, self.styles.width, self.styles.height = geometry
+            self.styles.offset = (x, y)
 
     def compose(self) -> ComposeResult:
         yield Label("  TOSSMINAL", id="term-header")
         with Horizontal(id="input-area"):
-            yield Label("toss#nixos $ ", id="prompt-label")
-            yield Input(id="term-input", placeholder="")
-        yield Static("Welcome to TOSS. Everything is CLI.\n", id="term-log")
+            yield Label(PROMPT, id="prompt-label")
+            yield PromptInput(id="term-input", placeholder="")
+        text = self.text or "Welcome to TOSS. Everything is CLI.\n"
+        if self.spilled:
+            with open(self.spilled) as f: text = f.read()
+            os.unlink(self.spilled)
+        log = TermLog(text, id="term-log")
+        for chunk, markup in self.backlog: log.scrollback.append(chunk, markup)
+        self.backlog.clear()
+        yield log
+
+    @property
+    def busy(self) -> bool: return bool(self.pty or (self.job and self.job.is_running))
+
+    def hibernate(self, spill_dir) -> dict:
+        """Spill scrollback to disk and hand over the shell so the widget can be unmounted."""
+        import tempfile
+        fd, path = tempfile.mkstemp(dir=spill_dir, suffix=".log")
+        os.close(fd)
+        self.query_one(TermLog).scrollback.spill(path)
+        session, self.session = self.session, None
+        return {"session": session, "scrollback": path, "geometry": self.geometry}
+
+    def write(self, text: str, markup=True) -> None:
+        logs = self.query(TermLog)
+        if logs: logs.first().write(text, markup)
+        # Daemon output can reach a window that is registered but not composed yet; compose() picks it up.
+        else: self.backlog.append((text, markup))
+
+    def show_output(self, out: str) -> None: self.write(CONTROL_CHARS.sub("", out), markup=False)
+
+    def start_job(self, cmd: str) -> None:
+        if self.job and self.job.is_running:
+            self.write("\n[#555555]job still running, Ctrl+C to cancel[/]")
+            return
+        self.interrupted = False
+        self.write(f"\ntoss#nixos $ {escape(cmd)}\n")
+        self.job = self.run_worker(self.run_job(cmd), group="job", exit_on_error=False)
+
+    async def run_job(self, cmd: str) -> None:
+        slots = self.app.job_slots
+        if slots.locked(): self.write("[#555555]waiting for a free job slot...[/]\n")
+        async with slots:
+            try:
+                status = await self.session.run(cmd, self.show_output)
+            except asyncio.CancelledError:
+                self.session.kill()
+                raise
+            except ConnectionError:
+                return self.write("\n[#555555]the TOSS core is gone, Alt+T opens a terminal with a local shell[/]")
+        if status is None: self.write("\n[#555555]shell exited, a new one starts with the next command[/]")
+        elif status: self.write(f"\n[#555555](exit {status})[/]")
+
+    async def run_tui(self, cmd: str) -> None:
+        if not HAS_PYTE:
+            self.write(f"\ntoss#nixos $ {escape(cmd)}")
+            with self.app.suspend(): os.system(cmd)
+            self.app.post_notification("Welcome Back, Bre!")
+            self.app.refresh()
+            return
+        if self.pty: return
+        self.write(f"\ntoss#nixos $ {escape(cmd)}")
+        self.pty = PtyView(cmd, cwd=self.session.cwd, id="term-pty")
+        self.query_one("#input-area").add_class("hidden")
+        self.query_one(TermLog).add_class("hidden")
+        await self.mount(self.pty, after="#term-header")
+        self.pty.focus()
+
+    def on_pty_view_exited(self, event: PtyView.Exited) -> None:
+        event.view.remove()
+        self.pty = None
+        self.query_one("#input-area").remove_class("hidden")
+        self.query_one(TermLog).remove_class("hidden")
+        if event.status: self.write(f"\n[#555555](exit {event.status})[/]")
+        self.query_one("#term-input").focus()
+
+    def action_cancel_job(self) -> None:
+        if self.pty: return self.pty.send("\x03")
+        if not (self.job and self.job.is_running): return
+        # A second Ctrl+C, or a loop with no child to signal, takes the shell down with it.
+        if self.interrupted or not self.session.interrupt():
+            self.session.restart()
+            self.job.cancel()
+            self.write(f"^C\n[#555555]killed the shell, a new one starts in {escape(self.session.cwd)}[/]")
+        else: self.write("^C")
+        self.interrupted = True
+
+    def on_unmount(self) -> None:
+        # Attached shells ignore this: only close_window() ends them, so a crashed or restarted UI leaves them running.
+        if self.session: self.session.close()
+        if self.app.remote_terms.get(getattr(self.session, "sid", None)) is self: del self.app.remote_terms[self.session.sid]
 
     def on_mouse_down(self, event: MouseDown) -> None:
         if event.y == 0 and self.app.is_floating: 
@@ -91,7 +1412,8 @@ class FloatingTerminal(Vertical):
             self.mouse_x, self.mouse_y = event.screen_x, event.screen_y
             self.orig_x = self.styles.offset.x.value
             self.orig_y = self.styles.offset.y.value
-        self.query_one("#term-input").focus()
+            self.geometry = None
+        (self.pty or self.query_one("#term-input")).focus()
 
     def on_mouse_move(self, event: MouseMove) -> None:
         if self.dragging:
@@ -103,6 +1425,7 @@ class FloatingTerminal(Vertical):
         self.dragging = False
         self.release_mouse()
 
+@instrumented("start_background", "notify_net", "notify_battery", "update_clock", "retile_dwm", "refresh_ws_tabs", "hibernate_ws", "wake_ws")
 class TOSS(App):
     CSS = """
     Screen { background: #000000; layers: base windows top overlay; overflow: hidden; padding: 0; margin: 0; }
@@ -116,18 +1439,23 @@ class TOSS(App):
     #taskbar { dock: bottom; height: 1; width: 100%; background: #1c1c1c; color: #ffffff; layer: top; }
     .ws-active { background: #a6e22e; color: #000000; text-style: bold; padding: 0 2; }
     .ws-inactive { padding: 0 2; color: #585858; background: #1c1c1c; }
+    .ws-inactive.ws-asleep { color: #3a3a3a; }
+    #ws-tabs { width: auto; height: 1; }
     #spacer { width: 1fr; }
-    #stats-area { color: #ffffff; background: #333333; padding: 0 1; }
+    #stats-area { width: auto; color: #ffffff; background: #333333; padding: 0 1; }
     #clock { background: #1c1c1c; color: #ffffff; text-style: bold; padding: 0 1; }
 
-    #notify-box { 
-        display: none; width: 32; height: auto; background: #111111; border: double #a6e22e; 
-        color: #ffffff; layer: overlay; padding: 1; position: absolute;
-    }
-    #notify-box.show { display: block; }
+    #toasts { width: 32; height: auto; layer: overlay; position: absolute; }
+    .toast { width: 100%; height: auto; background: #111111; border: double #a6e22e; color: #ffffff; padding: 0 1; }
+    #profile-overlay { display: none; width: 70; height: auto; background: #111111; border: heavy #a6e22e; color: #ffffff; layer: overlay; position: absolute; offset-x: 2; offset-y: 1; padding: 0 1; }
 
     #wallpaper-menu, #start-menu, #brivol-menu { display: none; width: 34; height: auto; background: #111111; border: heavy white; layer: overlay; padding: 1; position: absolute; offset-x: 2; offset-y: 1; }
-    #wallpaper-menu.show, #start-menu.show, #brivol-menu.show { display: block; }
+    #wallpaper-menu.show, #start-menu.show, #brivol-menu.show, #wifi-panel.show { display: block; }
+    #wifi-panel { display: none; width: 64; height: auto; background: #111111; border: heavy white; layer: overlay; padding: 0 1; position: absolute; offset-x: 2; offset-y: 1; }
+    #wifi-list { height: auto; max-height: 12; border: none; background: #111111; margin: 1 0; }
+    #wifi-pass { border: none; height: 1; background: #1a1a1a; color: #ffffff; padding: 0 1; }
+    #wifi-log { color: #888888; height: auto; }
+    #wifi-hint { color: #555555; }
     #brivol-bars { height: 10; margin: 1 0; align: center middle; }
     .brivol-col { width: 14; align: center middle; text-align: center; }
     .col-label { text-style: bold; color: #888888; margin-bottom: 1; }
@@ -139,7 +1467,8 @@ class TOSS(App):
     .floating-win { width: 80; height: 24; border: heavy #555555; background: #0c0c0c; layer: windows; position: absolute; }
     .tiling-win { border: solid #333333; background: #000000; layer: windows; position: absolute; margin: 0; padding: 0; }
     #term-header { background: #a6e22e; color: #000000; width: 100%; text-style: bold; height: 1; }
-    #term-log { height: 1fr; padding: 0 1; color: #ffffff; overflow-y: scroll; }
+    #term-pty { height: 1fr; width: 100%; background: #000000; }
+    #term-log { height: 1fr; padding: 0 1; color: #ffffff; overflow-y: scroll; overflow-x: auto; }
     #input-area { height: 1; width: 100%; background: #1a1a1a; padding: 0 1; }
     #prompt-label { color: #a6e22e; text-style: bold; width: auto; }
     #term-input { width: 1fr; height: 1; background: transparent; border: none; color: #ffffff; padding: 0; }
@@ -150,20 +1479,31 @@ class TOSS(App):
         Binding("alt+t", "open_terminal", "Terminal"),
         Binding("alt+e", "open_tfiler", "File Explorer"),
         Binding("alt+space", "toggle_float", "Float"),
+        Binding("alt+n", "cycle_layout", "Next Layout"),
+        Binding("alt+comma", "resize_master(-0.05)", "Shrink Master"),
+        Binding("alt+full_stop", "resize_master(0.05)", "Grow Master"),
+        Binding("alt+i", "change_nmaster(1)", "More Masters"),
+        Binding("alt+d", "change_nmaster(-1)", "Fewer Masters"),
         Binding("alt+q", "close_active_window", "Close Window"), 
-        Binding("alt+1", "switch_ws(1)", "WS 1"),
-        Binding("alt+2", "switch_ws(2)", "WS 2"),
+        *[Binding(f"alt+{n}", f"switch_ws({n})", f"WS {n}", show=False) for n in range(1, 10)],
+        Binding("alt+right", "step_ws(1)", "Next WS"),
+        Binding("alt+left", "step_ws(-1)", "Prev WS"),
         Binding("alt+shift+q", "toggle_menu", "System Menu"),
         Binding("alt+w", "toggle_wallpaper", "Wallpaper"),
         Binding("alt+l", "lock_screen", "Lock"),
+        Binding("alt+p", "toggle_profile", "Profiler"),
         Binding("escape", "hide_all", "Hide"),
     ]
 
+    def __init__(self, core_socket=None, **kwargs):
+        super().__init__(**kwargs)
+        self.bus, self.commands, self.history = EventBus(), CommandIndex(), History()
+        self.core_socket, self.core, self.remote_terms = core_socket, None, {}
+
     def compose(self) -> ComposeResult:
         with Container(id="main-frame"):
             with Container(id="desktop"):
-                yield Container(id="ws-1")
-                yield Container(id="ws-2", classes="hidden")
+                yield Container(id="ws-1", classes="workspace")
                 with Vertical(id="wallpaper-menu"):
                     yield Label("[bold white] SELECT COLOR [/]")
                     yield Button("TOKYO NIGHT", id="wall-grey", classes="wall-btn")
@@ -175,202 +1515,315 @@ class TOSS(App):
                     yield Button("LOCK SCREEN", id="btn-lock", classes="menu-btn")
                     yield Button("QUIT TOSS", id="btn-quit", classes="menu-btn")
                 yield BrivolMenu(id="brivol-menu")
-                yield Static("", id="notify-box") 
+                yield WifiPanel(id="wifi-panel")
+                yield Toaster(id="toasts")
+                yield ProfileOverlay(id="profile-overlay")
         with Vertical(id="lock-screen"):
             with Vertical(id="lock-container"):
                 yield Static("", id="big-clock") 
                 yield Label("SPACE TO UNLOCK", id="unlock-label")
         with Horizontal(id="taskbar"):
-            yield Label(" [1] ", id="btn-ws1", classes="ws-active")
-            yield Label(" [2] ", id="btn-ws2", classes="ws-inactive")
+            with Horizontal(id="ws-tabs"):
+                yield Label(" [1] ", id="btn-ws1", classes="ws-active")
             yield Static(id="spacer")
-            yield Label("...", id="stats-area")
+            yield TaskbarStats("...", id="stats-area")
             yield Label("00:00", id="clock")
 
     def on_mount(self) -> None:
         self.current_ws, self.is_locked, self.is_floating = 1, False, False
-        self.last_wifi_status = self.check_wifi_status()
-        self.set_interval(1, self.update_system_info)
-        self.set_interval(5, self.monitor_network)
-        self.action_open_terminal(auto_tfetch=True)
-
-    def post_notification(self, message: str, duration: int = 3):
-        box = self.query_one("#notify-box")
-        screen_w = self.query_one("#desktop").content_size.width
-        box.styles.offset = (screen_w - 35, 1) 
-        box.update(f"[bold #a6e22e]TOSS NOTIFY[/]\n{message}")
-        box.add_class("show")
-        def hide_notif(): box.remove_class("show")
-        asyncio.get_event_loop().call_later(duration, hide_notif)
-
-    def check_wifi_status(self):
-        try:
-            res = subprocess.getoutput("nmcli -t -f DEVICE,STATE dev | grep connected | wc -l")
-            return int(res.strip()) > 0
-        except: return False
+        self.layout, self.master_ratio, self.nmaster = "tile", MASTER_RATIO, 1
+        self.layout_passes, self.style_writes = 0, 0
+        self.workspaces = {1: self.get_widget_by_id("ws-1")}
+        self.hibernated, self.sleep_timers, self.spill_dir = {}, {}, None
+        self.job_slots = asyncio.Semaphore(MAX_JOBS)
+        self.loop, self.sampler, self.net = asyncio.get_running_loop(), None, None
+        PROFILE.start(self.loop)
+        self.battery = None
+        self.bus.subscribe(NetChanged, self.notify_net)
+        self.bus.subscribe(Battery, self.notify_battery)
+        self.update_clock()
+        self.run_worker(self.attach() if self.core_socket else self.action_open_terminal(auto_tfetch=True))
+        # Nothing below is needed for the first frame, so it waits until that frame is on screen.
+        self.call_after_refresh(self.start_background)
+
+    def start_background(self) -> None:
+        """Sensors and probes: metrics thread, network watcher, brightness/volume, Wi-Fi scans, command index and history."""
+        if not self.core_socket:
+            self.sampler = MetricSampler(self.on_metrics)
+            self.sampler.start()
+            self.net = make_net_backend()
+            self.run_worker(self.start_network())
+        self.query_one(BrivolMenu).refresh_levels()
+        self.query_one(WifiPanel).start()
+        self.refresh_commands()
+        self.run_worker(self.history.load, thread=True)
+
+    def refresh_commands(self) -> None:
+        self.commands.checked = time.monotonic()
+        self.run_worker(self.commands.refresh, thread=True, group="commands", exclusive=True)
+
+    def post_notification(self, message: str, duration: int = 3, key=None):
+        self.query_one(Toaster).post(message, duration, key)
 
-    def monitor_network(self):
-        current = self.check_wifi_status()
-        if current != self.last_wifi_status:
-            msg = "✔ WiFi Connected" if current else "✘ WiFi Disconnected"
-            self.post_notification(msg)
-            self.last_wifi_status = current
+    async def start_network(self) -> None: self.net = await start_net_backend(self.net, self.on_net_change)
+
+    def on_net_change(self, iface: str, up: bool) -> None:
+        self.bus.publish(NetChanged(iface, up, self.net.is_wireless(iface)))
+
+    def notify_net(self, event: NetChanged) -> None:
+        kind = "WiFi" if event.wireless else "Network"
+        self.post_notification(f"✔ {kind} Connected ({event.iface})" if event.up else f"✘ {kind} Disconnected ({event.iface})",
+                               key=f"net:{event.iface}")
+
+    def notify_battery(self, event: Battery) -> None:
+        if event.percent <= BATTERY_LOW and event.plugged is False:
+            self.post_notification(f"⚠ Battery low ({event.percent}%)", key="battery")
 
     def action_open_wifi_manager(self) -> None:
         if self.is_locked: return
-        with self.suspend():
-            try:
-                os.system("clear")
-                print("┌────────────────────────────────────────────────────────┐")
-                print("│             TOSS SMART WIFI - INTERFACE SELECT         │")
-                print("│        (Press Ctrl+C or Enter empty to EXIT)           │")
-                print("├────────────────────────────────────────────────────────┤")
-                
-                interfaces = subprocess.getoutput("ip -br link show | awk '{print $1}'").split()
-                print("  Available Interfaces:")
-                for i, net in enumerate(interfaces):
-                    desc = "(Wireless)" if net.startswith('w') else "(Wired/Other)"
-                    print(f"  [{i}] {net} {desc}")
-                
-                idx_input = input("\n  Which interface? (number): ").strip()
-                if not idx_input: return 
-
-                iface = interfaces[int(idx_input)]
-                print(f"\n  Scanning on {iface}...")
-                os.system(f"ip link set {iface} up > /dev/null 2>&1")
-                os.system(f"nmcli device wifi rescan > /dev/null 2>&1")
-                os.system(f"nmcli -f SSID,SIGNAL,BARS,SECURITY device wifi list ifname {iface}")
-                
-                print("\n  [1] Quick Connect")
-                print("  [2] Cancel/Exit")
-                
-                pilih = input("\n  Option: ").strip()
-                if pilih != "1": return 
-
-                ssid = input("  Enter SSID: ").strip()
-                if not ssid: return
-                pw = input("  Enter Password: ").strip()
-                
-                print(f"\n  Connecting to {ssid}...")
-                cmd = f"nmcli device wifi connect '{ssid}' password '{pw}' ifname {iface}"
-                res = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                
-                if "Error" in res.stderr:
-                    print("  [!] Standard failed. Applying Deep Connect...")
-                    os.system(f"nmcli connection delete '{ssid}' > /dev/null 2>&1")
-                    deep_cmd = f"nmcli connection add type wifi con-name '{ssid}' ifname {iface} ssid '{ssid}' -- wifi-sec.key-mgmt wpa-psk && nmcli connection modify '{ssid}' wifi-sec.psk '{pw}' && nmcli connection up '{ssid}'"
-                    os.system(deep_cmd)
-                else:
-                    print("  [+] Connected!")
-                input("\n  Press Enter to return...")
-            except (KeyboardInterrupt, EOFError, ValueError):
-                pass 
-        self.post_notification("Welcome Back, Bre!")
-        self.refresh()
-        self.retile_dwm()
+        self.query_one(WifiPanel).open()
+
+    async def attach(self) -> None:
+        """Client mode: connect to the core daemon and mount a window for each of its shells."""
+        from tossd import CoreClient, RemoteSession
+        self.remote = RemoteMetrics()
+        try:
+            self.core = await CoreClient.connect(self.core_socket, self.on_core_event)
+            state = await self.core.request({"op": "attach"})
+            # A frame per scrollback: all of them together could outgrow one. A shell closed meanwhile answers with an error.
+            logs = [(await self.core.request({"op": "log", "sid": rec["sid"]})).get("log") for rec in state["sessions"]]
+        except (OSError, ConnectionError) as e:
+            self.post_notification(f"✘ No TOSS core on {self.core_socket} ({e})", duration=10)
+            self.core = None
+            return await self.action_open_terminal(auto_tfetch=True)
+        for name, values in state["metrics"].items():
+            for value in values: self.remote.push({name: value}, state["plugged"])
+        if self.remote.rings: self.on_metrics(self.remote)
+        sessions = [(rec, log) for rec, log in zip(state["sessions"], logs) if log is not None]
+        if not sessions: return await self.action_open_terminal(auto_tfetch=True)
+        for rec, log in sessions:
+            await self.mount_remote(RemoteSession(self.core, rec["sid"], rec["cwd"]), rec["ws"], log)
+        if not any(term.ws_owner == self.current_ws for term in self.remote_terms.values()):
+            await self.action_switch_ws(min(term.ws_owner for term in self.remote_terms.values()))
+        term = [term for term in self.remote_terms.values() if term.ws_owner == self.current_ws][-1]
+        self.call_after_refresh(self.retile_dwm)
+        self.call_after_refresh(term.query_one("#term-input").focus)
 
-    def update_system_info(self) -> None:
+    async def mount_remote(self, session, ws_num: int, text=None) -> None:
+        term = FloatingTerminal(ws_owner=ws_num, session=session, text=text,
+                                classes="floating-win" if self.is_floating else "tiling-win")
+        self.remote_terms[session.sid] = term
+        await (await self.ensure_ws(ws_num)).mount(term)
+        if ws_num == self.current_ws: self.call_after_refresh(self.retile_dwm)
+        await self.refresh_ws_tabs()
+
+    def on_core_event(self, msg: dict) -> None:
+        """Deltas the daemon broadcasts: shared sensors, and shells that another UI opened, used or closed."""
+        op, term = msg.get("op"), self.remote_terms.get(msg.get("sid"))
+        if op == "metrics":
+            self.remote.push(msg["values"], msg["plugged"])
+            self.on_metrics(self.remote)
+        elif op == "net":
+            self.bus.publish(NetChanged(msg["iface"], msg["up"], msg["wireless"]))
+        elif op == "opened" and term is None:
+            from tossd import RemoteSession
+            self.run_worker(self.mount_remote(RemoteSession(self.core, msg["sid"], msg["cwd"]), msg["ws"]))
+        elif op == "lost":
+            # From here on new windows get local shells, the daemon's windows stay up to be read.
+            self.core = None
+            self.post_notification("✘ Lost the TOSS core, its shells are gone; new terminals run locally", duration=10)
+        elif term is None: return
+        elif op == "output": term.show_output(msg["data"])
+        elif op == "started": term.write(f"\n{PROMPT}{escape(msg['cmd'])}\n")
+        elif op == "done":
+            term.session.cwd = msg["cwd"]
+            if msg["status"]: term.write(f"\n[#555555](exit {msg['status']})[/]")
+        elif op == "closed":
+            del self.remote_terms[msg["sid"]]
+            term.session = None
+            term.remove()
+            self.call_after_refresh(self.retile_dwm)
+
+    def exit(self, *args, **kwargs) -> None:
+        # Leave the daemon's shells running for the next UI.
+        if self.core: self.core.detach()
+        super().exit(*args, **kwargs)
+
+    def on_metrics(self, sampler: MetricSampler) -> None:
+        # Runs on the sampler thread: copy the round out of the rings here, the loop never touches them.
+        recent = {name: ring.last(6) for name, ring in list(sampler.rings.items()) if ring}
+        self.loop.call_soon_threadsafe(self.bus.publish, Metrics(recent))
+        if recent.get("battery"):
+            battery = Battery(round(recent["battery"][-1]), sampler.plugged)
+            if battery != self.battery:
+                self.battery = battery
+                self.loop.call_soon_threadsafe(self.bus.publish, battery)
+
+    def update_clock(self) -> None:
         now = datetime.now()
         time_short = now.strftime("%H:%M")
-        try:
-            self.query_one("#stats-area").update(f"CPU {psutil.cpu_percent()}% | RAM {psutil.virtual_memory().percent}%")
-            self.query_one("#clock").update(time_short)
-            if self.is_locked: self.query_one("#big-clock").update(get_ascii_clock(time_short))
-        except: pass
+        self.query_one("#clock").update(time_short)
+        if self.is_locked: self.query_one("#big-clock").update(get_ascii_clock(time_short))
+        self.set_timer(60.05 - now.second - now.microsecond / 1e6, self.update_clock)
 
     def retile_dwm(self):
-        ws = self.query_one(f"#ws-{self.current_ws}")
+        ws = self.workspaces[self.current_ws]
         windows = [w for w in ws.children if isinstance(w, FloatingTerminal)]
         if not windows: return
-        screen_w = self.query_one("#desktop").content_size.width
-        screen_h = self.query_one("#desktop").content_size.height
-        if self.is_floating:
-            for win in windows:
-                win.styles.width, win.styles.height = 80, 24
-                win.styles.offset = ((screen_w - 80) // 2, (screen_h - 24) // 2)
-        else:
-            count = len(windows)
-            if count == 1:
-                windows[0].styles.width, windows[0].styles.height = screen_w, screen_h
-                windows[0].styles.offset = (0, 0)
-            else:
-                master_w = int(screen_w * 0.6)
-                stack_w, stack_h = screen_w - master_w, screen_h // (count - 1)
-                windows[0].styles.width, windows[0].styles.height = master_w, screen_h
-                windows[0].styles.offset = (0, 0)
-                for i, win in enumerate(windows[1:]):
-                    win.styles.width, win.styles.height = stack_w, stack_h
-                    win.styles.offset = (master_w, i * stack_h)
+        size = self.query_one("#desktop").content_size
+        self.layout_passes += 1
+        layout = "float" if self.is_floating else self.layout
+        geoms = layout_geometry(layout, len(windows), size.width, size.height, round(self.master_ratio, 2), self.nmaster)
+        for win, geom in zip(windows, geoms):
+            if win.geometry == geom: continue
+            x, y, w, h = geom
+            win.styles.width, win.styles.height = w, h
+            win.styles.offset = (x, y)
+            win.geometry = geom
+            self.style_writes += 1
+
+    def on_resize(self) -> None:
+        self.call_after_refresh(self.retile_dwm)
+
+    def action_cycle_layout(self) -> None:
+        names = [n for n in LAYOUTS if n != "float"]
+        self.layout = names[(names.index(self.layout) + 1) % len(names)]
+        self.post_notification(f"Layout: {self.layout}", duration=1, key="layout")
+        self.retile_dwm()
+
+    def action_resize_master(self, delta: float) -> None:
+        self.master_ratio = max(0.1, min(0.9, self.master_ratio + delta))
+        self.retile_dwm()
+
+    def action_change_nmaster(self, delta: int) -> None:
+        self.nmaster = max(0, self.nmaster + delta)
+        self.retile_dwm()
 
     async def action_open_terminal(self, auto_tfetch=False) -> None:
         if self.is_locked: return
-        target_ws = self.query_one(f"#ws-{self.current_ws}")
-        term = FloatingTerminal(ws_owner=self.current_ws, classes="floating-win" if self.is_floating else "tiling-win")
-        target_ws.mount(term)
+        target_ws = self.workspaces[self.current_ws]
+        try: session = await self.core.open(self.current_ws) if self.core else None
+        # The daemon can go away before its "lost" event has been handled.
+        except ConnectionError: session = None
+        term = FloatingTerminal(ws_owner=self.current_ws, session=session, classes="floating-win" if self.is_floating else "tiling-win")
+        if session: self.remote_terms[session.sid] = term
+        await target_ws.mount(term)
         self.call_after_refresh(self.retile_dwm)
         self.call_after_refresh(term.query_one("#term-input").focus)
         if auto_tfetch: self.call_after_refresh(self.run_initial_tfetch, term)
+        return term
 
-    def action_open_tfiler(self) -> None:
+    async def action_open_tfiler(self) -> None:
         if self.is_locked: return
-        with self.suspend(): os.system("ranger")
-        self.post_notification("Welcome Back, Bre!")
-        self.refresh()
+        term = await self.action_open_terminal()
+        await term.run_tui("ranger")
         self.retile_dwm()
 
     def run_initial_tfetch(self, term):
-        log = term.query_one("#term-log")
-        log.update(f"{str(log.content)}\ntoss#nixos $ tfetch\n[bold #a6e22e]TOSS OS v0.1[/]\n[#555555]WS:[/] {self.current_ws}")
+        term.write(f"\ntoss#nixos $ tfetch\n[bold #a6e22e]TOSS OS v0.1[/]\n[#555555]WS:[/] {self.current_ws}")
 
-    def on_input_submitted(self, event: Input.Submitted) -> None:
+    async def on_input_submitted(self, event: Input.Submitted) -> None:
         cmd = event.value.strip()
         if not cmd: return
         term_widget = event.input.parent.parent
-        log = term_widget.query_one("#term-log")
-        if cmd.lower() == "tosser": cmd = "links https://duckduckgo.com/lite"
-        if cmd.lower() == "tfiler": cmd = "ranger"
+        self.history.add(cmd)
+        cmd = ALIASES.get(cmd.lower(), cmd)
         base_cmd = cmd.split()[0].lower()
-        if base_cmd in ["vi", "vim", "ranger", "htop", "ytfzf", "links", "elinks", "w3m"]:
-            log.update(f"{str(log.content)}\ntoss#nixos $ {cmd}")
-            with self.suspend(): os.system(cmd)
-            self.post_notification("Welcome Back, Bre!")
-            self.refresh()
-        elif base_cmd == "exit":
-            term_widget.remove()
-            self.call_after_refresh(self.retile_dwm)
-        else:
-            try:
-                res = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                log.update(f"{str(log.content)}\ntoss#nixos $ {cmd}\n{res.stdout}{res.stderr}")
-            except: pass
         event.input.value = ""
-        log.scroll_end(animate=False)
+        if base_cmd in TUI_COMMANDS:
+            await term_widget.run_tui(cmd)
+        elif base_cmd == "exit": self.close_window(term_widget)
+        else:
+            term_widget.start_job(cmd)
 
     def action_close_active_window(self) -> None:
         try:
-            ws = self.query_one(f"#ws-{self.current_ws}")
+            ws = self.workspaces[self.current_ws]
             windows = [w for w in ws.children if isinstance(w, FloatingTerminal)]
-            if windows:
-                windows[-1].remove()
-                self.call_after_refresh(self.retile_dwm)
+            if windows: self.close_window(windows[-1])
         except: pass
 
+    def close_window(self, term) -> None:
+        """Exit or Alt+Q: the one path that also ends an attached shell in the daemon, for every UI."""
+        if self.core and term.session: term.session.end()
+        term.remove()
+        self.call_after_refresh(self.retile_dwm)
+
     def action_toggle_float(self) -> None:
         self.is_floating = not self.is_floating
-        ws = self.query_one(f"#ws-{self.current_ws}")
+        ws = self.workspaces[self.current_ws]
         for win in ws.children:
             if isinstance(win, FloatingTerminal): win.set_classes("floating-win" if self.is_floating else "tiling-win")
         self.call_after_refresh(self.retile_dwm)
 
     def action_toggle_menu(self) -> None: self.query_one("#start-menu").toggle_class("show")
-    def action_switch_ws(self, ws_num: int) -> None:
+    def workspace_numbers(self) -> list:
+        return sorted(set(self.workspaces) | set(self.hibernated))
+
+    async def action_switch_ws(self, ws_num: int) -> None:
+        old = self.current_ws
+        await self.ensure_ws(ws_num)
+        if timer := self.sleep_timers.pop(ws_num, None): timer.stop()
+        await self.wake_ws(ws_num)
         self.current_ws = ws_num
-        self.query_one("#ws-1").set_class(ws_num != 1, "hidden")
-        self.query_one("#ws-2").set_class(ws_num != 2, "hidden")
-        self.query_one("#btn-ws1").classes = "ws-active" if ws_num == 1 else "ws-inactive"
-        self.query_one("#btn-ws2").classes = "ws-active" if ws_num == 2 else "ws-inactive"
+        for n, ws in self.workspaces.items(): ws.display = n == ws_num
+        if old != ws_num and old in self.workspaces:
+            if old != 1 and not self.workspaces[old].children: await self.workspaces.pop(old).remove()
+            else: self.sleep_timers[old] = self.set_timer(HIBERNATE_AFTER, lambda: self.hibernate_ws(old))
+        await self.refresh_ws_tabs()
         self.retile_dwm()
 
+    async def action_step_ws(self, delta: int) -> None:
+        numbers = self.workspace_numbers()
+        i = numbers.index(self.current_ws) + delta
+        if i >= len(numbers): await self.action_switch_ws(numbers[-1] + 1)
+        elif i >= 0: await self.action_switch_ws(numbers[i])
+
+    async def refresh_ws_tabs(self) -> None:
+        tabs, numbers = self.query_one("#ws-tabs"), self.workspace_numbers()
+        for label in list(tabs.children):
+            if int(label.id[6:]) not in numbers: await label.remove()
+        have = {int(label.id[6:]) for label in tabs.children}
+        await tabs.mount_all([Label(f" [{n}] ", id=f"btn-ws{n}") for n in numbers if n not in have])
+        tabs.sort_children(key=lambda label: int(label.id[6:]))
+        for label in tabs.children:
+            n = int(label.id[6:])
+            classes = {"ws-active"} if n == self.current_ws else {"ws-inactive", "ws-asleep"} if n in self.hibernated else {"ws-inactive"}
+            if label.classes != classes: label.set_classes(classes)
+
+    async def ensure_ws(self, ws_num: int) -> Container:
+        if ws_num not in self.workspaces:
+            self.workspaces[ws_num] = Container(id=f"ws-{ws_num}", classes="workspace")
+            self.workspaces[ws_num].display = ws_num == self.current_ws
+            await self.query_one("#desktop").mount(self.workspaces[ws_num], before="#wallpaper-menu")
+        return self.workspaces[ws_num]
+
+    async def hibernate_ws(self, ws_num: int) -> None:
+        """Unmount an idle off-screen workspace, spilling each terminal's scrollback to disk."""
+        self.sleep_timers.pop(ws_num, None)
+        # Attached shells already live in the daemon; there is nothing to hand over.
+        if self.core or ws_num == self.current_ws or ws_num not in self.workspaces: return
+        ws = self.workspaces[ws_num]
+        windows = [w for w in ws.children if isinstance(w, FloatingTerminal)]
+        if not windows: return
+        if any(w.busy for w in windows):
+            self.sleep_timers[ws_num] = self.set_timer(HIBERNATE_AFTER, lambda: self.hibernate_ws(ws_num))
+            return
+        if not self.spill_dir:
+            import tempfile
+            self.spill_dir = tempfile.mkdtemp(prefix="toss-spill-")
+        self.hibernated[ws_num] = [w.hibernate(self.spill_dir) for w in windows]
+        # Dropping the container too releases its cached arrangement of the old windows.
+        await self.workspaces.pop(ws_num).remove()
+        await self.refresh_ws_tabs()
+
+    async def wake_ws(self, ws_num: int) -> None:
+        records = self.hibernated.pop(ws_num, None)
+        if not records: return
+        classes = "floating-win" if self.is_floating else "tiling-win"
+        await self.workspaces[ws_num].mount_all(
+            [FloatingTerminal(ws_owner=ws_num, classes=classes, **rec) for rec in records])
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "wall-black": self.query_one("#desktop").styles.background = "#0a0a0a"
         if event.button.id == "wall-grey": self.query_one("#desktop").styles.background = "#1a1b26"
@@ -382,6 +1835,7 @@ class TOSS(App):
         if event.button.id == "btn-brivol": 
             self.query_one("#brivol-menu").add_class("show")
             self.query_one("#brivol-menu").focus()
+            self.query_one(BrivolMenu).refresh_levels()
             self.query_one("#start-menu").remove_class("show")
             return
         if event.button.id == "btn-quit": self.exit()
@@ -389,6 +1843,7 @@ class TOSS(App):
 
     def action_lock_screen(self) -> None:
         self.is_locked = True
+        self.query_one("#big-clock").update(get_ascii_clock(datetime.now().strftime("%H:%M")))
         self.query_one("#lock-screen").add_class("show")
         self.action_hide_all()
 
@@ -399,11 +1854,82 @@ class TOSS(App):
     def on_key(self, event: Key) -> None:
         if self.is_locked and event.key in ("space", "enter"): self.action_unlock()
 
+    def action_toggle_profile(self) -> None: self.query_one(ProfileOverlay).toggle()
     def action_toggle_wallpaper(self) -> None: self.query_one("#wallpaper-menu").toggle_class("show")
     def action_hide_all(self) -> None:
         self.query_one("#start-menu").remove_class("show")
         self.query_one("#wallpaper-menu").remove_class("show")
         self.query_one("#brivol-menu").remove_class("show")
+        self.query_one("#wifi-panel").remove_class("show")
+
+    def on_unmount(self) -> None:
+        PROFILE.stop()
+        self.history.flush()
+        if self.sampler: self.sampler.stop()
+        if self.net: self.net.stop()
+        for records in self.hibernated.values():
+            for rec in records: rec["session"].close()
+        if self.spill_dir: shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+class StartupProfile:
+    """Wall-clock marks for --profile-startup, measured from the first line of this module."""
+    def __init__(self):
+        self.marks, self.last, self.css = [], STARTED, 0.0
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.marks.append((phase, now - self.last))
+        self.last = now
+
+    def timed(self, fn):
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: self.css += time.perf_counter() - t
+        return wrapper
+
+    def report(self) -> str:
+        rows = [f"  {phase:12} {took * 1000:8.1f}ms" for phase, took in self.marks]
+        rows.append(f"  {'total':12} {(self.last - STARTED) * 1000:8.1f}ms")
+        return "\n".join(["startup:", *rows, f"  of which css parse {self.css * 1000:.1f}ms"])
+
+class ProfiledTOSS(TOSS):
+    """TOSS that records each startup phase and quits as soon as the first frame is painted."""
+    def __init__(self, profile):
+        self.profile = profile
+        super().__init__()
+        profile.mark("app init")
+        self.stylesheet.parse = profile.timed(self.stylesheet.parse)
+        self.stylesheet.reparse = profile.timed(self.stylesheet.reparse)
+
+    def compose(self) -> ComposeResult:
+        self.profile.mark("run setup")
+        yield from super().compose()
+
+    def on_mount(self) -> None:
+        self.profile.mark("compose")
+        super().on_mount()
+        self.profile.mark("on_mount")
+        self.call_after_refresh(self.first_paint)
+
+    def start_background(self) -> None: pass
+
+    def first_paint(self) -> None:
+        self.profile.mark("first paint")
+        self.exit()
 
-def main(): TOSS().run()
+def main():
+    args = sys.argv[1:]
+    if "--trace" in args:
+        if args.index("--trace") + 1 == len(args): sys.exit("usage: main.py [--trace FILE.jsonl] [--profile-startup] [--attach [SOCKET]]")
+        PROFILE.open_trace(args[args.index("--trace") + 1])
+    if "--attach" in args:
+        import tossd
+        rest = args[args.index("--attach") + 1:]
+        return TOSS(core_socket=rest[0] if rest and not rest[0].startswith("--") else tossd.default_socket()).run()
+    if "--profile-startup" not in args: return TOSS().run()
+    profile = StartupProfile()
+    profile.mark("imports")
+    ProfiledTOSS(profile).run()
+    print(profile.report())
 if __name__ == "__main__": main()
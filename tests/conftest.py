@@ -0,0 +1,41 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path, monkeypatch):
+    """Keep shell history and other state out of the real home directory."""
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture(autouse=True)
+def fake_devices(monkeypatch):
+    """Booting TOSS must not reach the real nmcli, brightnessctl or amixer on a developer's machine."""
+    import hwctl
+    import main
+    monkeypatch.setattr(main, "make_wifi_backend", lambda: main.FakeWifi())
+    monkeypatch.setattr(main, "make_net_backend", lambda: main.FakeNetBackend())
+    monkeypatch.setattr(main, "Hardware", lambda: hwctl.Hardware(bri=hwctl.MockChannel(), vol=hwctl.MockChannel()))
+
+async def until(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+def toasts(app) -> list:
+    """Every toast body the app is showing or has queued."""
+    import main
+    toaster = app.query_one(main.Toaster)
+    return [body for body, _ in toaster.pending.values()] + [body for _, _, body in toaster.shown.values()]
+
+def log_text(term) -> str:
+    """A terminal's scrollback as plain text, empty while it is not composed yet."""
+    import main
+    logs = term.query(main.TermLog)
+    return "\n".join(getattr(line, "plain", line) for line in logs.first().scrollback.lines) if logs else ""
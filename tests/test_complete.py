@@ -0,0 +1,94 @@
+import asyncio
+import os
+
+import main
+from conftest import until
+
+def make_exe(directory, name):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+
+def test_command_index_relists_only_changed_dirs(tmp_path):
+    bin_a, bin_b = tmp_path / "a", tmp_path / "b"
+    bin_a.mkdir(), bin_b.mkdir()
+    make_exe(bin_a, "tossgrep")
+    make_exe(bin_b, "tosscat")
+    (bin_b / "tossdata").write_text("not executable")
+    index = main.CommandIndex(aliases={"tosser": ""})
+    path = f"{bin_a}{os.pathsep}{bin_b}"
+    assert index.refresh(path)
+    assert index.complete("toss") == ["tosscat", "tosser", "tossgrep"]
+    assert index.complete("tossg") == ["tossgrep"] and index.complete("nope") == []
+    assert not index.refresh(path) and not index.stale
+    make_exe(bin_a, "tossls")
+    os.utime(bin_a, ns=(0, os.stat(bin_a).st_mtime_ns + 10**9))
+    assert index.refresh(path)
+    assert index.complete("tossl") == ["tossls"]
+    # Dropping a directory from PATH drops its names too.
+    assert index.refresh(str(bin_a)) and index.complete("toss") == ["tosser", "tossgrep", "tossls"]
+
+def test_complete_path_marks_dirs_hides_dotfiles_and_caps_the_scan(tmp_path, monkeypatch):
+    (tmp_path / "alps").mkdir()
+    (tmp_path / "alpha.txt").write_text("")
+    (tmp_path / ".alias").write_text("")
+    assert main.complete_path("al", tmp_path) == ["alpha.txt", "alps/"]
+    assert main.complete_path(".al", tmp_path) == [".alias"]
+    assert main.complete_path("alps/", tmp_path) == [] and main.complete_path("nowhere/", tmp_path) == []
+    for i in range(50): (tmp_path / "alps" / f"f{i}").write_text("")
+    monkeypatch.setattr(main, "COMPLETE_SCAN", 10)
+    assert len(main.complete_path("alps/f", tmp_path)) == 10
+
+def test_history_batches_trims_and_searches(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "HISTORY_FLUSH", 0.1)
+    path = tmp_path / "history"
+    async def scenario():
+        history = main.History(path=str(path), limit=3)
+        for cmd in ("ls", "ls", "cd /tmp", "make", "make test"):
+            history.add(cmd)
+        assert history.entries == ["cd /tmp", "make", "make test"]
+        assert not path.exists()  # nothing is written until the batch is due
+        await until(lambda: path.exists())
+        assert path.read_text().splitlines() == ["ls", "cd /tmp", "make", "make test"]
+        history.add("git status")
+        history.flush()
+        assert history.flusher is None and path.read_text().endswith("make test\ngit status\n")
+        assert history.search("make", len(history.entries)) == 1
+        assert history.search("make", 1) == 0 and history.search("cd", 1) == -1
+    asyncio.run(scenario())
+    path.write_text("".join(f"cmd{i}\n" for i in range(7)))
+    history = main.History(path=str(path), limit=3)
+    history.load()
+    # A file past twice the limit is rewritten with only what is kept.
+    assert history.entries == ["cmd4", "cmd5", "cmd6"] and path.read_text() == "cmd4\ncmd5\ncmd6\n"
+
+def test_prompt_tab_up_and_ctrl_r(tmp_path):
+    (tmp_path / "notes.txt").write_text("")
+    (tmp_path / "notebook").mkdir()
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: isinstance(app.focused, main.PromptInput))
+            prompt, term = app.focused, app.query_one(main.FloatingTerminal)
+            term.session.cwd = str(tmp_path)
+            await pilot.press(*"cat no", "tab")
+            assert prompt.value == "cat note"
+            await pilot.press("s", "tab")
+            assert prompt.value == "cat notes.txt "
+            prompt.set_value("tosse")
+            await pilot.press("tab")
+            assert prompt.value == "tosser "
+            app.history.entries = ["make", "ls -la", "make test"]
+            prompt.set_value("draft")
+            await pilot.press("up", "up")
+            assert prompt.value == "ls -la"
+            await pilot.press("down", "down")
+            assert prompt.value == "draft"
+            prompt.set_value("make")
+            await pilot.press("ctrl+r")
+            assert prompt.value == "make test" and "search 'make'" in str(term.query_one("#prompt-label").render())
+            await pilot.press("ctrl+r")
+            assert prompt.value == "make"
+            await pilot.press("x")
+            assert prompt.search is None
+    asyncio.run(scenario())
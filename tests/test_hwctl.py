@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+import hwctl
+
+class SlowChannel(hwctl.MockChannel):
+    def write(self, level):
+        time.sleep(0.05)
+        super().write(level)
+
+def test_burst_collapses_into_one_write():
+    async def scenario():
+        hw = hwctl.Hardware(bri=hwctl.MockChannel(), vol=hwctl.MockChannel())
+        for level in range(40, 90, 5): hw.set("bri", level)
+        await hw.flush()
+        return hw
+    hw = asyncio.run(scenario())
+    assert hw.channels["bri"].writes == [85]
+    assert hw.channels["vol"].writes == []
+
+def test_levels_set_during_a_write_keep_only_the_latest():
+    async def scenario():
+        bri = SlowChannel()
+        hw = hwctl.Hardware(bri=bri, vol=hwctl.MockChannel())
+        hw.set("bri", 10)
+        await asyncio.sleep(0.01)  # first write is now in flight
+        for level in range(20, 110, 10): hw.set("bri", level)
+        await hw.flush()
+        return bri
+    assert asyncio.run(scenario()).writes == [10, 100]
+
+def test_levels_are_clamped():
+    channel = hwctl.MockChannel()
+    channel.write(140)
+    channel.write(-3)
+    assert channel.writes == [100, 0]
+
+class DeadChannel(hwctl.MockChannel):
+    def read(self): return None
+
+def run_main(monkeypatch, argv, channel):
+    monkeypatch.setattr(hwctl, "backlight", lambda: channel)
+    hwctl.main(argv)
+
+@pytest.mark.parametrize("argv", [[], ["get"], ["set", "bri"], ["set", "bri", "abc"], ["up", "bri", "x"],
+                                  ["up", "bri", "5", "6"], ["get", "bri", "1"], ["frob", "bri"]])
+def test_cli_rejects_bad_arguments_with_usage(monkeypatch, argv):
+    channel = hwctl.MockChannel()
+    with pytest.raises(SystemExit) as exit:
+        run_main(monkeypatch, argv, channel)
+    assert "Usage:" in str(exit.value.code)
+    assert channel.writes == []
+
+def test_cli_steps_and_sets(monkeypatch, capsys):
+    channel = hwctl.MockChannel(40)
+    run_main(monkeypatch, ["up", "bri"], channel)
+    run_main(monkeypatch, ["down", "bri", "15"], channel)
+    run_main(monkeypatch, ["set", "bri", "120"], channel)
+    run_main(monkeypatch, ["get", "bri"], channel)
+    assert capsys.readouterr().out.split() == ["45", "30", "100", "100"]
+    assert channel.writes == [45, 30, 100]
+
+@pytest.mark.parametrize("op", ["get", "up", "down"])
+def test_cli_fails_instead_of_guessing_an_unreadable_level(monkeypatch, capsys, op):
+    channel = DeadChannel()
+    with pytest.raises(SystemExit) as exit:
+        run_main(monkeypatch, [op, "bri"], channel)
+    assert exit.value.code and exit.value.code != 0
+    assert channel.writes == [] and capsys.readouterr().out == ""
+
+def test_keys_before_hardware_is_ready_reach_it(monkeypatch):
+    import threading
+    from textual import events
+    import main
+    from conftest import until
+    bri, ready = hwctl.MockChannel(50), threading.Event()
+    def slow_hardware():
+        ready.wait(5)
+        return hwctl.Hardware(bri=bri, vol=hwctl.MockChannel(50))
+    monkeypatch.setattr(main, "Hardware", slow_hardware)
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)):
+            menu = app.query_one(main.BrivolMenu)
+            await until(lambda: menu.loading)
+            for _ in range(3): menu.on_key(events.Key("down", None))
+            assert menu.hw is None and menu.bri == 85
+            ready.set()
+            await until(lambda: bri.writes and not menu.loading)
+            # The queued level wins over the 50% the hardware reported while it was being built.
+            assert bri.writes == [85] and menu.bri == 85
+    asyncio.run(scenario())
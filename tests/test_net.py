@@ -0,0 +1,21 @@
+import asyncio
+
+import main
+from conftest import toasts, until
+
+def test_link_flip_posts_one_toast_per_interface(monkeypatch):
+    monkeypatch.setattr(main, "make_net_backend", lambda: main.FakeNetBackend({"wlan0": True, "eth0": False}))
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.net and app.net.states)
+            assert toasts(app) == []
+            app.net.set("wlan0", False)
+            await until(lambda: any("WiFi Disconnected (wlan0)" in body for body in toasts(app)))
+            app.net.set("wlan0", True)
+            await until(lambda: any("WiFi Connected (wlan0)" in body for body in toasts(app)))
+            # Same key: the flip back replaced the first toast instead of stacking a second one.
+            assert sum("wlan0" in body for body in toasts(app)) == 1
+            app.net.set("eth0", True)
+            await until(lambda: any("Network Connected (eth0)" in body for body in toasts(app)))
+    asyncio.run(scenario())
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import main
+from conftest import log_text, until
+
+def test_keys_answered_while_command_runs():
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: app.query(main.FloatingTerminal))
+            term = app.query_one(main.FloatingTerminal)
+            term.start_job("sleep 5")
+            await until(lambda: term.busy)
+            started = time.monotonic()
+            await pilot.press("alt+t")
+            await until(lambda: len(app.query(main.FloatingTerminal)) == 2, timeout=1.0)
+            assert time.monotonic() - started < 1.0
+            assert term.busy
+    asyncio.run(scenario())
+
+def test_open_line_redrawn_after_append():
+    from textual.app import App
+
+    class LogApp(App):
+        def compose(self): yield main.TermLog(id="log")
+
+    async def scenario():
+        app = LogApp()
+        async with app.run_test(size=(40, 10)) as pilot:
+            log = app.query_one(main.TermLog)
+            log.write("loading...")
+            await pilot.pause()
+            assert log.render_line(0).text.rstrip() == "loading..."
+            log.write(" done\n")
+            await pilot.pause()
+            assert log.render_line(0).text.rstrip() == "loading... done"
+    asyncio.run(scenario())
+
+def test_ctrl_c_escalates_to_restarting_the_shell():
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: app.query(main.FloatingTerminal))
+            term = app.query_one(main.FloatingTerminal)
+            term.query_one("#term-input").focus()
+            term.start_job("cd /tmp; while :; do i=$((i+1)); done")
+            await until(lambda: term.busy)
+            await pilot.press("ctrl+c")
+            await until(lambda: not term.busy)
+            assert "killed the shell" in log_text(term)
+            term.start_job("echo fresh in $PWD")
+            await until(lambda: f"fresh in {term.session.cwd}\n" in log_text(term))
+    asyncio.run(scenario())
+
+@pytest.mark.skipif(not main.HAS_PYTE, reason="needs pyte")
+def test_pty_command_owns_its_terminal():
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.query(main.FloatingTerminal))
+            term = app.query_one(main.FloatingTerminal)
+            await term.run_tui("python3 -c 'import os; print(\"ctty\", os.tcgetpgrp(0) == os.getpgrp())'; cat")
+            await until(lambda: term.pty and term.pty.vt and "ctty" in "".join(term.pty.vt.display))
+            assert "ctty True" in "".join(term.pty.vt.display)
+            term.pty.send("\x03")  # only reaches cat as SIGINT through a controlling terminal
+            await until(lambda: term.pty is None)
+    asyncio.run(scenario())
+
+def test_terminal_handlers_are_timed():
+    for name in ("start_job", "run_tui", "action_cancel_job", "on_unmount"):
+        assert hasattr(getattr(main.FloatingTerminal, name), "__wrapped__"), name
+
+def test_output_split_inside_a_tag_stays_text():
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: app.query(main.FloatingTerminal))
+            term = app.query_one(main.FloatingTerminal)
+            await until(lambda: "TOSS OS" in log_text(term))  # the startup banner must not land mid-tag
+            term.start_job("""python3 -c "import sys, time; sys.stdout.write('[/' + 'x' * 40); sys.stdout.flush(); time.sleep(0.3); print(']')\"""")
+            await until(lambda: "[/" + "x" * 40 + "]" in log_text(term))
+            await pilot.pause()
+            log = term.query_one(main.TermLog)
+            assert any("[/xxxx" in log.render_line(y).text for y in range(log.size.height))
+            # Spilled scrollback round-trips through markup() without turning output into tags.
+            copy = main.Scrollback()
+            copy.append(log.scrollback.markup())
+            plain = lambda sb: [getattr(line, "plain", line) for line in sb.lines]
+            assert plain(copy) == plain(log.scrollback)
+    asyncio.run(scenario())
+
+def test_long_lines_scroll_sideways():
+    from textual.app import App
+
+    class LogApp(App):
+        def compose(self): yield main.TermLog(id="log")
+
+    async def scenario():
+        app = LogApp()
+        async with app.run_test(size=(40, 10)) as pilot:
+            log = app.query_one(main.TermLog)
+            log.write("a" * 100 + "END\tx\n", markup=False)
+            await pilot.pause()
+            assert log.virtual_size.width >= 104
+            assert "END" not in log.render_line(0).text
+            log.scroll_to(x=log.max_scroll_x, animate=False, immediate=True)
+            await pilot.pause()
+            assert "END" in log.render_line(0).text
+    asyncio.run(scenario())
+
+def test_idle_workspace_sleeps_and_wakes_intact(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "HIBERNATE_AFTER", 0.2)
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.query(main.FloatingTerminal))
+            term = app.query_one(main.FloatingTerminal)
+            term.start_job(f"cd {tmp_path}; echo before sleep")
+            await until(lambda: "before sleep\n" in log_text(term))
+            await until(lambda: term.geometry)
+            geometry, session = term.geometry, term.session
+            term.start_job("sleep 0.8")
+            await until(lambda: term.busy)
+            await app.action_switch_ws(2)
+            # A running job keeps the workspace awake and only pushes the next try back.
+            await asyncio.sleep(0.4)
+            assert 1 in app.workspaces and 1 in app.sleep_timers
+            # Hibernated once the old container has left the DOM too, so waking can mount a fresh #ws-1.
+            await until(lambda: 1 in app.hibernated and not app.query("#ws-1"), timeout=3.0)
+            assert 1 not in app.workspaces
+            spilled = app.hibernated[1][0]["scrollback"]
+            assert "before sleep" in open(spilled).read()
+            await app.action_switch_ws(1)
+            woken = app.workspaces[1].query_one(main.FloatingTerminal)
+            assert woken is not term and woken.session is session and woken.geometry == geometry
+            assert "before sleep\n" in log_text(woken)
+            assert not os.path.exists(spilled) and 1 not in app.hibernated
+            woken.start_job("pwd")
+            await until(lambda: f"{tmp_path}\n" in log_text(woken))
+    asyncio.run(scenario())
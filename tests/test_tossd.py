@@ -0,0 +1,157 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import main
+import tossd
+from conftest import log_text, toasts, until
+
+@pytest.fixture
+def core(tmp_path):
+    path = str(tmp_path / "run" / "toss.sock")
+    # The daemon is its own process, so it gets the fake network backend the same way the fixtures give it to TOSS.
+    serve = f"import asyncio, main, tossd; main.make_net_backend = main.FakeNetBackend; asyncio.run(tossd.serve({path!r}))"
+    proc = subprocess.Popen([sys.executable, "-c", serve], cwd=os.path.dirname(os.path.abspath(tossd.__file__)))
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path):
+        assert proc.poll() is None and time.monotonic() < deadline, "tossd did not start"
+        time.sleep(0.05)
+    yield path
+    proc.terminate()
+    proc.wait(5)
+
+def test_shells_survive_a_ui_that_goes_away_without_exit(core):
+    async def scenario():
+        app = main.TOSS(core_socket=core)
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.remote_terms)
+            term = next(iter(app.remote_terms.values()))
+            term.start_job("echo survived; cd /tmp")
+            await until(lambda: term.session.cwd == "/tmp")
+        # run_test teardown unmounts everything without TOSS.exit(), like a crash would.
+        app = main.TOSS(core_socket=core)
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.remote_terms)
+            assert list(app.remote_terms) == [1]
+            term = app.remote_terms[1]
+            assert "survived" in log_text(term) and term.session.cwd == "/tmp"
+            await until(lambda: app.focused is term.query_one("#term-input"))
+    asyncio.run(scenario())
+
+def test_runs_and_closes_reach_every_client(core):
+    async def scenario():
+        seen = []
+        app = main.TOSS(core_socket=core)
+        async with app.run_test(size=(120, 40)):
+            await until(lambda: app.remote_terms)
+            other = await tossd.CoreClient.connect(core, seen.append)
+            term = app.remote_terms[1]
+            term.start_job("echo from-a")
+            await until(lambda: any(m["op"] == "done" for m in seen))
+            assert "from-a\n" in [m.get("data") for m in seen if m["op"] == "output"]
+            session = await other.open(2)
+            await session.run("echo from-b", None)
+            await until(lambda: session.sid in app.remote_terms and "from-b" in log_text(app.remote_terms[session.sid]))
+            app.close_window(term)
+            await until(lambda: any(m["op"] == "closed" and m["sid"] == 1 for m in seen))
+            state = await other.request({"op": "attach"})
+            assert [rec["sid"] for rec in state["sessions"]] == [session.sid]
+            other.detach()
+    asyncio.run(scenario())
+
+def test_requests_fail_once_the_daemon_is_gone(core):
+    async def scenario():
+        events = []
+        client = await tossd.CoreClient.connect(core, events.append)
+        client.writer.transport.abort()
+        await until(lambda: client.task.done())
+        assert events == [{"op": "lost"}]
+        with pytest.raises(ConnectionError): await client.request({"op": "attach"})
+    asyncio.run(scenario())
+
+def test_socket_directory_must_be_private(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    os.chmod(shared, 0o755)
+    with pytest.raises(PermissionError): tossd.check_dir(str(shared / "toss.sock"))
+    with pytest.raises(SystemExit): asyncio.run(tossd.serve(str(shared / "toss.sock")))
+    os.chmod(shared, 0o700)
+    tossd.check_dir(str(shared / "toss.sock"))
+
+def test_reattach_replays_output_that_looks_like_markup(core):
+    tag = "[/" + "x" * 40 + "]"
+    async def scenario():
+        client = await tossd.CoreClient.connect(core, lambda msg: None)
+        session = await client.open(1)
+        await session.run("python3 -c \"import sys, time; sys.stdout.write('[/' + 'x' * 40); sys.stdout.flush(); "
+                          "time.sleep(0.3); print(']')\"; echo '[bold]not bold[/bold]'", None)
+        client.detach()
+        app = main.TOSS(core_socket=core)
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: app.remote_terms)
+            term = app.remote_terms[session.sid]
+            await pilot.pause()
+            assert tag in log_text(term) and "[bold]not bold[/bold]" in log_text(term)
+            log = term.query_one(main.TermLog)
+            assert any(tag in log.render_line(y).text for y in range(log.size.height))
+    asyncio.run(scenario())
+
+def test_lost_core_leaves_new_terminals_local(core):
+    async def scenario():
+        app = main.TOSS(core_socket=core)
+        async with app.run_test(size=(120, 40)) as pilot:
+            await until(lambda: app.remote_terms)
+            remote = app.remote_terms[1]
+            app.core.writer.transport.abort()
+            await until(lambda: app.core is None)
+            assert any("Lost the TOSS core" in body for body in toasts(app))
+            await pilot.press("alt+t")
+            await until(lambda: len(app.query(main.FloatingTerminal)) == 2)
+            local = next(term for term in app.query(main.FloatingTerminal) if term is not remote)
+            assert isinstance(local.session, main.ShellSession)
+            remote.start_job("echo hi")
+            await until(lambda: "the TOSS core is gone" in log_text(remote))
+    asyncio.run(scenario())
+
+def test_snapshot_gets_its_own_frame_and_no_slow_client_drop(tmp_path, monkeypatch):
+    # In-process daemon, so its send buffer limit can be smaller than one snapshot.
+    monkeypatch.setattr(tossd, "SEND_BUFFER", 2**16)
+    path = str(tmp_path / "run" / "toss.sock")
+    async def scenario():
+        server = asyncio.create_task(tossd.serve(path))
+        await until(lambda: os.path.exists(path))
+        client = await tossd.CoreClient.connect(path, lambda msg: None)
+        session = await client.open(1)
+        await session.run("head -c 600000 /dev/zero | tr '\\0' x | fold -w 1000", None)
+        reader, writer = await asyncio.open_unix_connection(path)
+        await tossd.read_frame(reader)
+        writer.write(tossd.encode({"op": "attach", "req": 1}))
+        writer.write(tossd.encode({"op": "log", "sid": session.sid, "req": 2}))
+        await writer.drain()
+        await asyncio.sleep(0.2)  # not reading while other output is broadcast
+        await session.run("echo meanwhile", None)
+        replies = {}
+        while len(replies) < 2:
+            msg = await asyncio.wait_for(tossd.read_frame(reader), 5)
+            assert msg is not None, "dropped while taking in the snapshot"
+            if msg.get("req"): replies[msg["req"]] = msg
+        assert "log" not in replies[1]["sessions"][0]
+        assert len(replies[2]["log"]) > 600000 and replies[2]["log"].rstrip().endswith("x" * 1000)
+        # A dropped client would still have been flushed what was queued; it has to be served after that too.
+        writer.write(tossd.encode({"op": "attach", "req": 3}))
+        while (msg := await asyncio.wait_for(tossd.read_frame(reader), 5)) and msg.get("req") != 3: pass
+        assert msg is not None, "dropped while taking in the snapshot"
+        writer.close()
+        client.detach()
+        server.cancel()
+        with pytest.raises(asyncio.CancelledError): await server
+    asyncio.run(scenario())
+
+def test_tail_keeps_whole_lines():
+    assert tossd.tail("ab\ncd\nef", 100) == "ab\ncd\nef"
+    assert tossd.tail("ab\ncd\nef", 5) == "ef"
+    assert tossd.tail("abcdef", 3) == ""
@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import main
+from conftest import toasts, until
+
+NETWORKS = [main.Network("home", 80, "WPA2", False), main.Network("cafe", 40, "", False)]
+
+def joined(wifi, monkeypatch, ssid, password):
+    monkeypatch.setattr(main, "make_wifi_backend", lambda: wifi)
+    async def scenario():
+        app = main.TOSS()
+        async with app.run_test(size=(120, 40)) as pilot:
+            panel = app.query_one(main.WifiPanel)
+            await until(lambda: panel.cache.get("wlan0"))
+            app.action_open_wifi_manager()
+            await pilot.pause()
+            panel.query_one(main.OptionList).highlighted = [n.ssid for n in panel.listed].index(ssid)
+            await pilot.press("enter")
+            if password is not None:
+                await pilot.press(*password, "enter")
+            await until(lambda: any(f"Joined {ssid}" in body or f"Could not join {ssid}" in body for body in toasts(app)))
+            return toasts(app), list(panel.log_lines)
+    return asyncio.run(scenario())
+
+def test_connect_falls_back_to_deep_connect(monkeypatch):
+    wifi = main.FakeWifi(NETWORKS, passwords={"home": "hunter22"}, broken={"home"})
+    bodies, log = joined(wifi, monkeypatch, "home", "hunter22")
+    assert [call[0] for call in wifi.calls if call[0] != "scan"] == ["connect", "deep_connect"]
+    assert any("✔ Joined home" in body for body in bodies)
+    assert "standard connect failed, applying Deep Connect..." in log
+    assert wifi.active == "home"
+
+def test_open_network_joins_without_password_or_fallback(monkeypatch):
+    wifi = main.FakeWifi(NETWORKS)
+    bodies, _ = joined(wifi, monkeypatch, "cafe", None)
+    assert [call for call in wifi.calls if call[0] != "scan"] == [("connect", "wlan0", "cafe", None)]
+    assert any("✔ Joined cafe" in body for body in bodies)
+
+def test_wrong_password_fails_after_both_attempts(monkeypatch):
+    wifi = main.FakeWifi(NETWORKS, passwords={"home": "hunter22"})
+    bodies, _ = joined(wifi, monkeypatch, "home", "nope")
+    assert [call[0] for call in wifi.calls if call[0] != "scan"] == ["connect", "deep_connect"]
+    assert any("✘ Could not join home" in body for body in bodies)
+    assert wifi.active is None
+
+def test_nmcli_never_sees_the_password_in_argv(monkeypatch):
+    wifi, calls = main.NmcliWifi(), []
+    async def run(*args, progress=None):
+        keyfile = args[args.index("passwd-file") + 1] if "passwd-file" in args else None
+        calls.append((args, keyfile and (open(keyfile).read(), os.stat(keyfile).st_mode & 0o777)))
+        return (10 if args[:2] == ("-t", "connection") else 0), []
+    monkeypatch.setattr(wifi, "run", run)
+    assert asyncio.run(wifi.connect("wlan0", "home", "hunter22", print))
+    assert asyncio.run(wifi.deep_connect("wlan0", "home", "hunter22", print))
+    assert not any("hunter22" in arg for args, _ in calls for arg in args)
+    ups = [secret for args, secret in calls if "up" in args]
+    assert ups == [("802-11-wireless-security.psk:hunter22\n", 0o600)] * 2
+    assert not os.path.exists(calls[-1][0][-1])
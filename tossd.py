@@ -0,0 +1,290 @@
+"""TOSS core daemon: shells, the metric sampler and the network watcher run here once per machine and
+every attached UI shares them.
+
+Usage: python3 tossd.py [SOCKET]            serve (default $XDG_RUNTIME_DIR/toss.sock)
+       python3 main.py --attach [SOCKET]    UI client; starts the daemon when none is running
+
+Frames are a 4-byte big-endian length, a codec byte (m = msgpack, j = JSON) and the payload, so either
+side can talk to the other whether or not it has msgpack.
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import traceback
+
+try: import msgpack
+except ImportError: msgpack = None
+
+MAX_FRAME = 16 * 2**20
+SEND_BUFFER = 4 * 2**20
+CONNECT_WAIT = 5.0
+SNAPSHOT_CHARS = MAX_FRAME // 16  # a scrollback tail this long encodes under MAX_FRAME even as JSON \u escapes
+
+def default_socket():
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR") or f"/tmp/toss-{os.getuid()}", "toss.sock")
+
+def check_dir(path) -> None:
+    """Refuse a socket directory that anyone but us could have made or can write to: whoever owns it owns
+    the socket, and with it every command typed into the UI."""
+    directory = os.path.dirname(os.path.abspath(path))
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+        raise PermissionError(f"{directory} must be a directory owned by uid {os.getuid()} with mode 0700")
+
+def tail(text, limit) -> str:
+    """The last whole lines of text that fit in limit characters."""
+    if len(text) <= limit: return text
+    return text[text.find("\n", len(text) - limit) + 1 or len(text):]
+
+def encode(msg) -> bytes:
+    body = b"m" + msgpack.packb(msg, use_bin_type=True) if msgpack else b"j" + json.dumps(msg, separators=(",", ":")).encode()
+    return struct.pack(">I", len(body)) + body
+
+async def read_frame(reader):
+    """Next message, or None once the peer hangs up or sends something unreadable."""
+    try:
+        size, = struct.unpack(">I", await reader.readexactly(4))
+        if size > MAX_FRAME: return None
+        body = await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError): return None
+    if body[:1] == b"m": return msgpack.unpackb(body[1:], raw=False) if msgpack else None
+    return json.loads(body[1:])
+
+class Core:
+    """Daemon state: each shell session with its workspace number and scrollback, one sampler, one network watcher.
+
+    Replies carry the asking client's id ("by") and request id ("req"); everything else is broadcast as a delta.
+    A client whose send buffer passes SEND_BUFFER is dropped rather than holding up the rest, except while
+    a scrollback snapshot it asked for is still draining: each session's log is its own "log" request.
+    """
+    def __init__(self):
+        self.clients, self.sessions, self.next_sid, self.next_client = {}, {}, 1, 1
+        self.loop, self.sampler, self.net, self.tasks, self.snapshots = None, None, None, set(), set()
+
+    async def start(self) -> None:
+        from main import MetricSampler, make_net_backend, start_net_backend
+        self.loop = asyncio.get_running_loop()
+        self.sampler = MetricSampler(lambda sampler: self.loop.call_soon_threadsafe(self.send_metrics))
+        self.sampler.start()
+        self.net = await start_net_backend(make_net_backend(), self.on_net_change)
+
+    def stop(self) -> None:
+        self.sampler.stop()
+        self.net.stop()
+        for record in self.sessions.values(): record["session"].close()
+
+    def too_slow(self, cid, writer) -> bool:
+        if cid in self.snapshots or writer.transport.get_write_buffer_size() <= SEND_BUFFER: return False
+        del self.clients[cid]
+        writer.close()
+        return True
+
+    def send(self, cid, msg) -> None:
+        writer = self.clients.get(cid)
+        if writer and not self.too_slow(cid, writer): writer.write(encode(msg))
+
+    def broadcast(self, msg) -> None:
+        frame = encode(msg)
+        for cid, writer in list(self.clients.items()):
+            if not self.too_slow(cid, writer): writer.write(frame)
+
+    def snapshot(self, cid, msg) -> None:
+        """Reply with a scrollback snapshot, leaving the client out of the slow check until it has drained."""
+        writer = self.clients.get(cid)
+        if writer is None: return
+        writer.write(encode(msg))
+        self.snapshots.add(cid)
+        self.spawn(self.drained(cid, writer))
+
+    async def drained(self, cid, writer) -> None:
+        try: await writer.drain()
+        except ConnectionError: pass
+        finally: self.snapshots.discard(cid)
+
+    def send_metrics(self) -> None:
+        rings = self.sampler.rings
+        self.broadcast({"op": "metrics", "values": {name: ring.last(1)[0] for name, ring in list(rings.items()) if ring},
+                        "plugged": self.sampler.plugged})
+
+    def on_net_change(self, iface, up) -> None:
+        self.broadcast({"op": "net", "iface": iface, "up": up, "wireless": self.net.is_wireless(iface)})
+
+    def state(self) -> dict:
+        return {"op": "state",
+                "sessions": [{"sid": sid, "ws": r["ws"], "cwd": r["session"].cwd} for sid, r in self.sessions.items()],
+                "metrics": {name: ring.last() for name, ring in list(self.sampler.rings.items()) if ring},
+                "plugged": self.sampler.plugged,
+                "net": [[iface, up, self.net.is_wireless(iface)] for iface, up in self.net.states.items()]}
+
+    async def serve_client(self, reader, writer) -> None:
+        cid, self.next_client = self.next_client, self.next_client + 1
+        self.clients[cid] = writer
+        writer.write(encode({"op": "welcome", "client": cid}))
+        try:
+            while (msg := await read_frame(reader)) is not None and msg.get("op") != "detach":
+                self.handle(cid, msg)
+        finally:
+            self.clients.pop(cid, None)
+            writer.close()
+
+    def handle(self, cid, msg) -> None:
+        from main import ShellSession, Scrollback
+        op, sid, reply = msg.get("op"), msg.get("sid"), {"by": cid, "req": msg.get("req")}
+        if op == "attach": self.send(cid, {**self.state(), **reply})
+        elif op == "open":
+            sid, self.next_sid = self.next_sid, self.next_sid + 1
+            self.sessions[sid] = {"session": ShellSession(), "ws": msg.get("ws", 1), "log": Scrollback()}
+            self.broadcast({"op": "opened", "sid": sid, "ws": self.sessions[sid]["ws"], "cwd": self.sessions[sid]["session"].cwd, **reply})
+        elif sid not in self.sessions: self.send(cid, {"op": "error", "error": f"no session {sid}", **reply})
+        elif op == "run": self.spawn(self.run(sid, msg.get("cmd", ""), reply))
+        elif op == "log": self.snapshot(cid, {"op": "log", "log": tail(self.sessions[sid]["log"].markup(), SNAPSHOT_CHARS), **reply})
+        # Nothing to SIGINT means the shell is looping by itself, so it gets restarted straight away.
+        elif op == "interrupt":
+            if not self.sessions[sid]["session"].interrupt(): self.sessions[sid]["session"].restart()
+        elif op == "restart": self.sessions[sid]["session"].restart()
+        elif op == "close":
+            self.sessions.pop(sid)["session"].close()
+            self.broadcast({"op": "closed", "sid": sid, **reply})
+
+    def spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, sid, cmd, reply) -> None:
+        from main import CONTROL_CHARS, PROMPT
+        from rich.markup import escape
+        record = self.sessions[sid]
+        record["log"].append(f"\n{PROMPT}{escape(cmd)}\n")
+        # Only the "done" reply may settle the asker's request, so this one carries no req.
+        self.broadcast({"op": "started", "sid": sid, "cmd": cmd, "by": reply["by"]})
+        def output(text):
+            text = CONTROL_CHARS.sub("", text)
+            record["log"].append(text, markup=False)
+            self.broadcast({"op": "output", "sid": sid, "data": text})
+        status = await record["session"].run(cmd, output)
+        if status: record["log"].append(f"\n[#555555](exit {status})[/]")
+        self.broadcast({"op": "done", "sid": sid, "status": status, "cwd": record["session"].cwd, **reply})
+
+async def serve(path) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    try: check_dir(path)
+    except PermissionError as e: sys.exit(f"tossd: {e}")
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(path)
+            sys.exit(f"tossd: already serving on {path}")
+        except OSError: os.unlink(path)
+        finally: probe.close()
+    core, stop = Core(), asyncio.Event()
+    await core.start()
+    umask = os.umask(0o077)
+    try: server = await asyncio.start_unix_server(core.serve_client, path)
+    finally: os.umask(umask)
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP): core.loop.add_signal_handler(sig, stop.set)
+    try:
+        async with server: await stop.wait()
+    finally:
+        core.stop()
+        os.unlink(path)
+
+class RemoteSession:
+    """ShellSession stand-in for a shell that lives in the daemon.
+
+    Output is broadcast to every attached UI and arrives through the app's event handler, so run()
+    only waits for the exit status.
+    """
+    def __init__(self, client, sid, cwd):
+        self.client, self.sid, self.cwd = client, sid, cwd
+
+    async def run(self, cmd: str, on_output) -> int | None:
+        reply = await self.client.request({"op": "run", "sid": self.sid, "cmd": cmd})
+        self.cwd = reply.get("cwd") or self.cwd
+        return reply.get("status")
+
+    def interrupt(self) -> bool:
+        """The daemon restarts the shell itself when there is nothing to interrupt."""
+        self.client.send({"op": "interrupt", "sid": self.sid})
+        return True
+
+    def restart(self) -> None: self.client.send({"op": "restart", "sid": self.sid})
+
+    def kill(self) -> None:
+        """A UI that stops waiting for a job leaves it running in the daemon."""
+
+    def close(self) -> None:
+        """Unmounting a window keeps the shell for the next UI; end() is what closes it."""
+
+    def end(self) -> None: self.client.send({"op": "close", "sid": self.sid})
+
+class CoreClient:
+    """UI end of the socket: replies are matched to requests, our own echoes are dropped, other messages go to on_event."""
+    def __init__(self, reader, writer, client_id, on_event):
+        self.reader, self.writer, self.id, self.on_event = reader, writer, client_id, on_event
+        self.pending, self.next_req, self.detached = {}, 1, False
+        self.task = asyncio.create_task(self.listen())
+
+    @classmethod
+    async def connect(cls, path, on_event):
+        """Connect, starting a daemon first when nothing answers on path."""
+        try: reader, writer = await asyncio.open_unix_connection(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tossd.py"), path],
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+            deadline = asyncio.get_running_loop().time() + CONNECT_WAIT
+            while True:
+                await asyncio.sleep(0.05)
+                try:
+                    reader, writer = await asyncio.open_unix_connection(path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if asyncio.get_running_loop().time() > deadline: raise
+        # Checked once connected and before anything is sent, so it covers a daemon we just started too.
+        try: check_dir(path)
+        except PermissionError:
+            writer.close()
+            raise
+        welcome = await read_frame(reader)
+        if not welcome or welcome.get("op") != "welcome": raise ConnectionError(f"no TOSS core on {path}")
+        return cls(reader, writer, welcome["client"], on_event)
+
+    def send(self, msg) -> None:
+        if not self.writer.is_closing(): self.writer.write(encode(msg))
+
+    async def request(self, msg) -> dict:
+        if self.task.done(): raise ConnectionError("core daemon went away")
+        req, self.next_req = self.next_req, self.next_req + 1
+        self.pending[req] = asyncio.get_running_loop().create_future()
+        self.send({**msg, "req": req})
+        return await self.pending[req]
+
+    async def open(self, ws) -> RemoteSession:
+        reply = await self.request({"op": "open", "ws": ws})
+        return RemoteSession(self, reply["sid"], reply["cwd"])
+
+    async def listen(self) -> None:
+        while (msg := await read_frame(self.reader)) is not None:
+            if msg.get("by") != self.id:
+                # One bad event must not end the listener: every later request would wait forever.
+                try: self.on_event(msg)
+                except Exception: traceback.print_exc()
+            elif (future := self.pending.pop(msg.get("req"), None)) and not future.done(): future.set_result(msg)
+        for future in self.pending.values():
+            if not future.done(): future.set_exception(ConnectionError("core daemon went away"))
+        self.pending.clear()
+        if not self.detached: self.on_event({"op": "lost"})
+
+    def detach(self) -> None:
+        self.send({"op": "detach"})
+        self.detached = True
+        self.writer.close()
+
+if __name__ == "__main__":
+    asyncio.run(serve(sys.argv[1] if len(sys.argv) > 1 else default_socket()))